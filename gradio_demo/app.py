@@ -1,18 +1,21 @@
 import gradio as gr
 import asyncio
+import atexit
+import functools
 import os
+import signal
+import time
+import re
 import json
 import tempfile
-import shutil
+import threading
 from pathlib import Path
 import logging
-from typing import Optional, Tuple, List, Dict, Any
+from typing import Optional, Tuple, List, Dict, Any, Callable, Awaitable
 import traceback
 
-from demo_pipeline import GradioMultiTalkPipeline
-from input_processor import InputProcessor
 from utils import setup_logging, get_example_data, format_error_message
-from config import DemoConfig
+from config import get_config
 from ui_components import create_enhanced_status_components, create_system_info_component
 from queue_manager import queue_manager
 
@@ -20,25 +23,139 @@ from queue_manager import queue_manager
 setup_logging()
 logger = logging.getLogger(__name__)
 
+# Root for per-request scratch directories (tmpfs on most Linux hosts)
+REQUEST_TMP_ROOT = "/tmp" if os.path.isdir("/tmp") else None
+
+# Bounding box in the form "x_min,y_min,x_max,y_max"
+_BBOX_RE = re.compile(r'^\s*(\d+)\s*,\s*(\d+)\s*,\s*(\d+)\s*,\s*(\d+)\s*$')
+
+def _throttled(fn, min_interval: float = 0.1):
+    """
+    Wrap a progress callback so it fires at most once per min_interval (final update always passes)
+    
+    The latest update dropped by the throttle is kept; call the wrapper's flush()
+    once the producer is done so the UI does not stay on a stale value.
+    """
+    last_call = [0.0]
+    pending = []
+    
+    def wrapper(p: float):
+        now = time.monotonic()
+        if now - last_call[0] >= min_interval or p >= 1.0:
+            last_call[0] = now
+            pending.clear()
+            fn(p)
+        else:
+            pending[:] = [p]
+    
+    def flush():
+        if pending:
+            fn(pending.pop())
+    
+    wrapper.flush = flush
+    return wrapper
+
+def _check_size(path: str, mb_limit: float, label: str):
+    """Raise ValueError if the file at path is larger than mb_limit megabytes"""
+    size = os.path.getsize(path)
+    if size > mb_limit * 1024 * 1024:
+        raise ValueError(f"{label} exceeds the {mb_limit} MB size limit ({size / (1024 * 1024):.1f} MB)")
+
+# Custom CSS for better styling
+_CSS = """
+.gradio-container {
+    max-width: 1400px !important;
+}
+.output-video {
+    max-height: 500px;
+}
+.error-message {
+    color: #ff4444;
+    font-weight: bold;
+}
+.success-message {
+    color: #44ff44;
+    font-weight: bold;
+}
+#queue_status {
+    margin-bottom: 10px;
+}
+#progress_monitor {
+    margin-bottom: 10px;
+}
+#live_logs {
+    font-family: 'Courier New', monospace;
+    font-size: 11px;
+    background: #1f2937;
+    color: #f9fafb;
+}
+#system_info {
+    margin-top: 10px;
+}
+.status-panel {
+    border: 1px solid #e5e7eb;
+    border-radius: 8px;
+    padding: 10px;
+    margin-bottom: 15px;
+}
+"""
+
+_HEADER_MD = """
+# 🎬 MultiTalk: Audio-Driven Multi-Person Video Generation
+
+Generate realistic conversational videos with synchronized lip movements from audio and reference images.
+
+**Features:**
+- 💬 Single & multi-person conversation generation
+- 🎤 High-quality lip synchronization
+- 👥 Interactive character control via prompts
+- 📺 480p & 720p output support
+"""
+
 class MultiTalkGradioApp:
     def __init__(self):
-        self.config = DemoConfig()
+        self.config = get_config()
         self.pipeline = None
-        self.input_processor = InputProcessor()
-        self.temp_dir = tempfile.mkdtemp(prefix="multitalk_demo_")
-        logger.info(f"Temporary directory created: {self.temp_dir}")
+        self._input_processor = None
+        self._init_lock = threading.Lock()
+        self._input_processor_lock = threading.Lock()
+        
+        # Memoize preprocessing by (path, mtime, size) so re-clicking Generate with the
+        # same uploads (Gradio keeps content-addressed upload paths) skips decode/resample
+        self._process_image_lru = functools.lru_cache(maxsize=32)(
+            lambda path, mtime_ns, size: self.input_processor.process_image(path)
+        )
+        self._process_audio_lru = functools.lru_cache(maxsize=32)(
+            lambda path, mtime_ns, size: self.input_processor.process_single_audio(path)
+        )
+    
+    @property
+    def input_processor(self):
+        """Input processor, created on first access to keep startup light"""
+        if self._input_processor is None:
+            # First access can come from concurrent preprocessing threads; a second
+            # instance would leak its temp dir and track writes the other never sees
+            with self._input_processor_lock:
+                if self._input_processor is None:
+                    from input_processor import InputProcessor
+                    self._input_processor = InputProcessor()
+        return self._input_processor
         
     def initialize_pipeline(self):
         """Initialize the MultiTalk pipeline with error handling"""
         try:
-            if self.pipeline is None:
-                logger.info("Initializing MultiTalk pipeline...")
-                self.pipeline = GradioMultiTalkPipeline(
-                    ckpt_dir=self.config.CKPT_DIR,
-                    wav2vec_dir=self.config.WAV2VEC_DIR,
-                    device_id=self.config.DEVICE_ID
-                )
-                logger.info("Pipeline initialized successfully")
+            # Serialize with the background warmup so a click can't trigger a second load
+            with self._init_lock:
+                if self.pipeline is None:
+                    logger.info("Initializing MultiTalk pipeline...")
+                    # Deferred so the heavy torch/transformers import chain stays off the UI startup path
+                    from demo_pipeline import GradioMultiTalkPipeline
+                    self.pipeline = GradioMultiTalkPipeline(
+                        ckpt_dir=self.config.CKPT_DIR,
+                        wav2vec_dir=self.config.WAV2VEC_DIR,
+                        device_id=self.config.DEVICE_ID
+                    )
+                    logger.info("Pipeline initialized successfully")
             return True, "Pipeline ready"
         except Exception as e:
             error_msg = f"Failed to initialize pipeline: {str(e)}"
@@ -46,78 +163,227 @@ class MultiTalkGradioApp:
             logger.error(traceback.format_exc())
             return False, error_msg
 
-    def generate_single_person_video(
+    def _cached_process_image(self, image: str) -> str:
+        """Process an image, reusing the result for an unchanged file"""
+        stat = os.stat(image)
+        return self._process_image_lru(image, stat.st_mtime_ns, stat.st_size)
+
+    def _cached_process_audio(self, audio: str) -> str:
+        """Process an audio file, reusing the result for an unchanged file"""
+        stat = os.stat(audio)
+        return self._process_audio_lru(audio, stat.st_mtime_ns, stat.st_size)
+
+    async def _process_audio(self, audio: Optional[str]) -> str:
+        """Process an optional audio file off the event loop ("None" when absent)"""
+        if not audio:
+            return "None"
+        return await asyncio.to_thread(self._cached_process_audio, audio)
+
+    def _wait_for_input_files(self, input_data: Dict[str, Any]):
+        """Block until the processed inputs have been written to disk"""
+        try:
+            for path in (input_data["cond_image"], *input_data["cond_audio"].values()):
+                self.input_processor.wait_for_write(path)
+        except ValueError:
+            # The memoized results point at files that were never written; drop
+            # them so a retry of the same upload reprocesses it
+            self._process_image_lru.cache_clear()
+            self._process_audio_lru.cache_clear()
+            raise
+
+    async def _prepare_single_inputs(
         self,
         image: Optional[str],
-        audio: Optional[str], 
+        audio: Optional[str],
         prompt: str,
+        progress
+    ) -> Tuple[Optional[Dict[str, Any]], str]:
+        """Validate and preprocess single person inputs, returning (input_data, error_message)"""
+        # Validate inputs
+        if not image:
+            return None, "Please upload a reference image"
+        if not audio:
+            return None, "Please upload an audio file"
+        if not prompt.strip():
+            return None, "Please provide a text prompt"
+        
+        # Reject oversized uploads before any decoding work
+        try:
+            _check_size(image, self.config.MAX_IMAGE_SIZE_MB, "Image")
+            _check_size(audio, self.config.MAX_AUDIO_SIZE_MB, "Audio")
+        except ValueError as e:
+            return None, str(e)
+        
+        # Process inputs
+        # Image and audio preprocessing are independent, so run them concurrently
+        progress(0.2, desc="Processing image and audio...")
+        processed_image, processed_audio = await asyncio.gather(
+            asyncio.to_thread(self._cached_process_image, image),
+            self._process_audio(audio)
+        )
+        
+        input_data = {
+            "prompt": prompt.strip(),
+            "cond_image": processed_image,
+            "cond_audio": {
+                "person1": processed_audio
+            }
+        }
+        return input_data, ""
+
+    async def _prepare_multi_inputs(
+        self,
+        image: Optional[str],
+        audio1: Optional[str],
+        audio2: Optional[str],
+        audio_type: str,
+        prompt: str,
+        bbox_person1: Optional[str],
+        bbox_person2: Optional[str],
+        progress
+    ) -> Tuple[Optional[Dict[str, Any]], str]:
+        """Validate and preprocess multi-person inputs, returning (input_data, error_message)"""
+        # Validate inputs
+        if not image:
+            return None, "Please upload a reference image"
+        if not audio1 and not audio2:
+            return None, "Please upload at least one audio file"
+        if not prompt.strip():
+            return None, "Please provide a text prompt"
+        
+        # Parse bounding boxes if provided
+        bbox_dict = {}
+        if bbox_person1:
+            match = _BBOX_RE.match(bbox_person1)
+            if not match:
+                return None, "Invalid bounding box format for person 1. Use: x_min,y_min,x_max,y_max"
+            bbox_dict["person1"] = list(map(int, match.groups()))
+        if bbox_person2:
+            match = _BBOX_RE.match(bbox_person2)
+            if not match:
+                return None, "Invalid bounding box format for person 2. Use: x_min,y_min,x_max,y_max"
+            bbox_dict["person2"] = list(map(int, match.groups()))
+        
+        # Reject oversized uploads before any decoding work
+        try:
+            _check_size(image, self.config.MAX_IMAGE_SIZE_MB, "Image")
+            if audio1:
+                _check_size(audio1, self.config.MAX_AUDIO_SIZE_MB, "Person 1 audio")
+            if audio2:
+                _check_size(audio2, self.config.MAX_AUDIO_SIZE_MB, "Person 2 audio")
+        except ValueError as e:
+            return None, str(e)
+        
+        # Process inputs
+        # Image and both audio tracks are independent, so run them concurrently
+        progress(0.2, desc="Processing image and audio files...")
+        processed_image, processed_audio1, processed_audio2 = await asyncio.gather(
+            asyncio.to_thread(self._cached_process_image, image),
+            self._process_audio(audio1),
+            self._process_audio(audio2)
+        )
+        
+        input_data = {
+            "prompt": prompt.strip(),
+            "cond_image": processed_image,
+            "audio_type": audio_type,
+            "cond_audio": {
+                "person1": processed_audio1,
+                "person2": processed_audio2
+            }
+        }
+        if bbox_dict:
+            input_data["bbox"] = bbox_dict
+        return input_data, ""
+
+    async def _run_generate(
+        self,
+        mode: str,
+        prepare_inputs: Callable[..., Awaitable[Tuple[Optional[Dict[str, Any]], str]]],
         sampling_steps: int,
         text_guide_scale: float,
         audio_guide_scale: float,
         frame_num: int,
         seed: int,
-        progress=gr.Progress()
+        progress
     ) -> Tuple[Optional[str], str]:
-        """Generate single person video"""
+        """
+        Shared generation flow for both tabs
+        
+        Args:
+            mode: Generation mode ("single" or "multi")
+            prepare_inputs: Async callable taking the progress tracker and returning
+                (input_data, error_message) for the mode
+            
+        Returns:
+            Tuple of (video_path, status_message)
+        """
         try:
             # Initialize pipeline if needed
-            success, message = self.initialize_pipeline()
+            success, message = await asyncio.to_thread(self.initialize_pipeline)
             if not success:
                 return None, message
             
             progress(0.1, desc="Validating inputs...")
-            
-            # Validate inputs
-            if not image:
-                return None, "Please upload a reference image"
-            if not audio:
-                return None, "Please upload an audio file"
-            if not prompt.strip():
-                return None, "Please provide a text prompt"
-            
-            # Process inputs
-            progress(0.2, desc="Processing image...")
-            processed_image = self.input_processor.process_image(image)
-            
-            progress(0.3, desc="Processing audio...")
-            processed_audio = self.input_processor.process_single_audio(audio)
-            
-            # Create input data
-            input_data = {
-                "prompt": prompt.strip(),
-                "cond_image": processed_image,
-                "cond_audio": {
-                    "person1": processed_audio
-                }
-            }
+            input_data, error_msg = await prepare_inputs(progress)
+            if input_data is None:
+                return None, error_msg
+            await asyncio.to_thread(self._wait_for_input_files, input_data)
             
             # Generate video
             progress(0.4, desc="Generating video...")
-            output_path = self.pipeline.generate(
-                input_data=input_data,
-                sampling_steps=sampling_steps,
-                text_guide_scale=text_guide_scale,
-                audio_guide_scale=audio_guide_scale,
-                frame_num=frame_num,
-                seed=seed,
-                mode="single",
-                progress_callback=lambda p: progress(0.4 + p * 0.5, desc="Generating video...")
-            )
+            # Intermediate files live in a per-request scratch dir that is removed on exit
+            generation_progress = _throttled(lambda p: progress(0.4 + p * 0.5, desc="Generating video..."))
+            with tempfile.TemporaryDirectory(prefix="multitalk_req_", dir=REQUEST_TMP_ROOT) as req_tmp:
+                input_data["workdir"] = req_tmp
+                output_path = await asyncio.to_thread(
+                    self.pipeline.generate,
+                    input_data=input_data,
+                    sampling_steps=sampling_steps,
+                    text_guide_scale=text_guide_scale,
+                    audio_guide_scale=audio_guide_scale,
+                    frame_num=frame_num,
+                    seed=seed,
+                    mode=mode,
+                    progress_callback=generation_progress
+                )
+            generation_progress.flush()
             
             progress(1.0, desc="Complete!")
             
-            if output_path and os.path.exists(output_path):
+            # pipeline.generate only returns paths it has verified, so no re-stat here
+            if output_path:
                 return output_path, "Video generated successfully!"
             else:
                 return None, "Video generation failed - no output produced"
                 
         except Exception as e:
             error_msg = format_error_message(e)
-            logger.error(f"Single person generation failed: {error_msg}")
+            label = "Single person" if mode == "single" else "Multi-person"
+            logger.error(f"{label} generation failed: {error_msg}")
             logger.error(traceback.format_exc())
             return None, f"Generation failed: {error_msg}"
 
-    def generate_multi_person_video(
+    async def generate_single_person_video(
+        self,
+        image: Optional[str],
+        audio: Optional[str], 
+        prompt: str,
+        sampling_steps: int,
+        text_guide_scale: float,
+        audio_guide_scale: float,
+        frame_num: int,
+        seed: int,
+        progress=gr.Progress()
+    ) -> Tuple[Optional[str], str]:
+        """Generate single person video"""
+        return await self._run_generate(
+            "single",
+            functools.partial(self._prepare_single_inputs, image, audio, prompt),
+            sampling_steps, text_guide_scale, audio_guide_scale, frame_num, seed, progress
+        )
+
+    async def generate_multi_person_video(
         self,
         image: Optional[str],
         audio1: Optional[str],
@@ -134,138 +400,20 @@ class MultiTalkGradioApp:
         progress=gr.Progress()
     ) -> Tuple[Optional[str], str]:
         """Generate multi-person video"""
-        try:
-            # Initialize pipeline if needed
-            success, message = self.initialize_pipeline()
-            if not success:
-                return None, message
-            
-            progress(0.1, desc="Validating inputs...")
-            
-            # Validate inputs
-            if not image:
-                return None, "Please upload a reference image"
-            if not audio1 and not audio2:
-                return None, "Please upload at least one audio file"
-            if not prompt.strip():
-                return None, "Please provide a text prompt"
-            
-            # Process inputs
-            progress(0.2, desc="Processing image...")
-            processed_image = self.input_processor.process_image(image)
-            
-            progress(0.3, desc="Processing audio files...")
-            processed_audio1 = self.input_processor.process_single_audio(audio1) if audio1 else "None"
-            processed_audio2 = self.input_processor.process_single_audio(audio2) if audio2 else "None"
-            
-            # Create input data
-            input_data = {
-                "prompt": prompt.strip(),
-                "cond_image": processed_image,
-                "audio_type": audio_type,
-                "cond_audio": {
-                    "person1": processed_audio1,
-                    "person2": processed_audio2
-                }
-            }
-            
-            # Add bounding boxes if provided
-            if bbox_person1 or bbox_person2:
-                bbox_dict = {}
-                if bbox_person1:
-                    try:
-                        bbox_dict["person1"] = [int(x.strip()) for x in bbox_person1.split(",")]
-                    except:
-                        return None, "Invalid bounding box format for person 1. Use: x_min,y_min,x_max,y_max"
-                if bbox_person2:
-                    try:
-                        bbox_dict["person2"] = [int(x.strip()) for x in bbox_person2.split(",")]
-                    except:
-                        return None, "Invalid bounding box format for person 2. Use: x_min,y_min,x_max,y_max"
-                
-                if bbox_dict:
-                    input_data["bbox"] = bbox_dict
-            
-            # Generate video
-            progress(0.4, desc="Generating video...")
-            output_path = self.pipeline.generate(
-                input_data=input_data,
-                sampling_steps=sampling_steps,
-                text_guide_scale=text_guide_scale,
-                audio_guide_scale=audio_guide_scale,
-                frame_num=frame_num,
-                seed=seed,
-                mode="multi",
-                progress_callback=lambda p: progress(0.4 + p * 0.5, desc="Generating video...")
-            )
-            
-            progress(1.0, desc="Complete!")
-            
-            if output_path and os.path.exists(output_path):
-                return output_path, "Video generated successfully!"
-            else:
-                return None, "Video generation failed - no output produced"
-                
-        except Exception as e:
-            error_msg = format_error_message(e)
-            logger.error(f"Multi-person generation failed: {error_msg}")
-            logger.error(traceback.format_exc())
-            return None, f"Generation failed: {error_msg}"
+        return await self._run_generate(
+            "multi",
+            functools.partial(
+                self._prepare_multi_inputs,
+                image, audio1, audio2, audio_type, prompt, bbox_person1, bbox_person2
+            ),
+            sampling_steps, text_guide_scale, audio_guide_scale, frame_num, seed, progress
+        )
 
     def create_interface(self):
         """Create the Gradio interface"""
         
-        # Custom CSS for better styling
-        css = """
-        .gradio-container {
-            max-width: 1400px !important;
-        }
-        .output-video {
-            max-height: 500px;
-        }
-        .error-message {
-            color: #ff4444;
-            font-weight: bold;
-        }
-        .success-message {
-            color: #44ff44;
-            font-weight: bold;
-        }
-        #queue_status {
-            margin-bottom: 10px;
-        }
-        #progress_monitor {
-            margin-bottom: 10px;
-        }
-        #live_logs {
-            font-family: 'Courier New', monospace;
-            font-size: 11px;
-            background: #1f2937;
-            color: #f9fafb;
-        }
-        #system_info {
-            margin-top: 10px;
-        }
-        .status-panel {
-            border: 1px solid #e5e7eb;
-            border-radius: 8px;
-            padding: 10px;
-            margin-bottom: 15px;
-        }
-        """
-        
-        with gr.Blocks(css=css, title="MultiTalk: Audio-Driven Video Generation") as demo:
-            gr.Markdown("""
-            # 🎬 MultiTalk: Audio-Driven Multi-Person Video Generation
-            
-            Generate realistic conversational videos with synchronized lip movements from audio and reference images.
-            
-            **Features:**
-            - 💬 Single & multi-person conversation generation
-            - 🎤 High-quality lip synchronization
-            - 👥 Interactive character control via prompts
-            - 📺 480p & 720p output support
-            """)
+        with gr.Blocks(css=_CSS, title="MultiTalk: Audio-Driven Video Generation") as demo:
+            gr.Markdown(_HEADER_MD)
             
             # Enhanced Status Dashboard
             with gr.Row():
@@ -444,7 +592,9 @@ class MultiTalkGradioApp:
                     single_frames, single_seed  # Use hidden component
                 ],
                 outputs=[single_output_video, single_status],
-                show_progress=True
+                show_progress=True,
+                concurrency_limit=1,
+                concurrency_id="gpu_queue"
             )
             
             multi_generate_btn.click(
@@ -456,17 +606,25 @@ class MultiTalkGradioApp:
                     multi_frames, multi_seed  # Use hidden component
                 ],
                 outputs=[multi_output_video, multi_status],
-                show_progress=True
+                show_progress=True,
+                concurrency_limit=1,
+                concurrency_id="gpu_queue"  # Both tabs share the single GPU worker
             )
         
+        # Size the queue from config so status polling and preprocessing can run
+        # alongside the GPU-bound generation events
+        demo.queue(
+            default_concurrency_limit=self.config.MAX_CONCURRENT_USERS,
+            max_size=self.config.MAX_QUEUE_SIZE
+        )
+        
         return demo
 
     def cleanup(self):
         """Cleanup temporary files and resources"""
         try:
-            if os.path.exists(self.temp_dir):
-                shutil.rmtree(self.temp_dir)
-                logger.info(f"Cleaned up temporary directory: {self.temp_dir}")
+            if self._input_processor:
+                self._input_processor.cleanup()
             
             if self.pipeline:
                 self.pipeline.cleanup()
@@ -478,9 +636,23 @@ def main():
     """Main function to run the Gradio app"""
     app = MultiTalkGradioApp()
     
+    # demo.launch() blocks and never returns on SIGTERM, so cleanup must not rely on
+    # a finally block: run it at interpreter exit and on container stop
+    atexit.register(app.cleanup)
+    
+    def handle_sigterm(signum, frame):
+        logger.info("Received SIGTERM, shutting down...")
+        app.cleanup()
+        os._exit(0)
+    
+    signal.signal(signal.SIGTERM, handle_sigterm)
+    
     try:
         demo = app.create_interface()
         
+        # Load model weights while the server comes up instead of on the first click
+        threading.Thread(target=app.initialize_pipeline, name="pipeline-warmup", daemon=True).start()
+        
         # Launch the app
         demo.launch(
             server_name="0.0.0.0",
@@ -493,8 +665,6 @@ def main():
     except Exception as e:
         logger.error(f"Application error: {e}")
         logger.error(traceback.format_exc())
-    finally:
-        app.cleanup()
 
 if __name__ == "__main__":
     main()
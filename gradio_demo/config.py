@@ -1,66 +1,104 @@
 import os
+import time
+import functools
+from dataclasses import dataclass, field
 from pathlib import Path
 
+def _env_int(name: str, default: int) -> int:
+    """Read an integer setting from the environment"""
+    return int(os.environ.get(name, default))
+
+@dataclass(frozen=True, slots=True)
 class DemoConfig:
-    """Configuration settings for the MultiTalk Gradio demo"""
-    
-    def __init__(self):
-        # Model paths - these should be updated based on your installation
-        self.CKPT_DIR = os.getenv('MULTITALK_CKPT_DIR', 'weights/Wan2.1-I2V-14B-480P')
-        self.WAV2VEC_DIR = os.getenv('MULTITALK_WAV2VEC_DIR', 'weights/chinese-wav2vec2-base')
-        
-        # Device configuration
-        self.DEVICE_ID = int(os.getenv('MULTITALK_DEVICE_ID', '0'))
-        
-        # Demo settings
-        self.MAX_CONCURRENT_USERS = int(os.getenv('MULTITALK_MAX_USERS', '4'))
-        self.MAX_QUEUE_SIZE = int(os.getenv('MULTITALK_MAX_QUEUE', '10'))
-        
-        # Generation defaults
-        self.DEFAULT_SAMPLING_STEPS = 40
-        self.DEFAULT_TEXT_GUIDE_SCALE = 5.0
-        self.DEFAULT_AUDIO_GUIDE_SCALE = 4.0
-        self.DEFAULT_FRAME_NUM = 81
-        self.DEFAULT_SEED = 42
-        
-        # Limits
-        self.MAX_SAMPLING_STEPS = 50
-        self.MIN_SAMPLING_STEPS = 10
-        self.MAX_FRAME_NUM = 201
-        self.MIN_FRAME_NUM = 81
-        self.MAX_GUIDE_SCALE = 10.0
-        self.MIN_GUIDE_SCALE = 1.0
-        
-        # File size limits (in MB)
-        self.MAX_IMAGE_SIZE_MB = 10
-        self.MAX_AUDIO_SIZE_MB = 50
-        
-        # Timeout settings (in seconds)
-        self.GENERATION_TIMEOUT = 300  # 5 minutes
-        self.MODEL_LOAD_TIMEOUT = 120  # 2 minutes
-        
+    """Configuration settings for the MultiTalk Gradio demo
+
+    Environment overrides are read once when this module is imported; instances
+    are immutable and safe to share between threads.
+    """
+
+    # Model paths - these should be updated based on your installation
+    CKPT_DIR: str = os.environ.get('MULTITALK_CKPT_DIR', 'weights/Wan2.1-I2V-14B-480P')
+    WAV2VEC_DIR: str = os.environ.get('MULTITALK_WAV2VEC_DIR', 'weights/chinese-wav2vec2-base')
+
+    # Device configuration
+    DEVICE_ID: int = _env_int('MULTITALK_DEVICE_ID', 0)
+
+    # Demo settings
+    MAX_CONCURRENT_USERS: int = _env_int('MULTITALK_MAX_USERS', 4)
+    MAX_QUEUE_SIZE: int = _env_int('MULTITALK_MAX_QUEUE', 10)
+
+    # Generation defaults
+    DEFAULT_SAMPLING_STEPS: int = 40
+    DEFAULT_TEXT_GUIDE_SCALE: float = 5.0
+    DEFAULT_AUDIO_GUIDE_SCALE: float = 4.0
+    DEFAULT_FRAME_NUM: int = 81
+    DEFAULT_SEED: int = 42
+
+    # Limits
+    MAX_SAMPLING_STEPS: int = 50
+    MIN_SAMPLING_STEPS: int = 10
+    MAX_FRAME_NUM: int = 201
+    MIN_FRAME_NUM: int = 81
+    MAX_GUIDE_SCALE: float = 10.0
+    MIN_GUIDE_SCALE: float = 1.0
+
+    # File size limits (in MB)
+    MAX_IMAGE_SIZE_MB: int = 10
+    MAX_AUDIO_SIZE_MB: int = 50
+
+    # Timeout settings (in seconds)
+    GENERATION_TIMEOUT: int = 300  # 5 minutes
+    MODEL_LOAD_TIMEOUT: int = 120  # 2 minutes
+
+    # Model path existence is re-checked at most every PATH_CHECK_TTL seconds
+    PATH_CHECK_TTL: float = 5.0
+    _path_cache: dict = field(default_factory=dict, init=False, repr=False, compare=False)
+
+    def __post_init__(self):
         # Validate paths
         self._validate_paths()
-    
+
+    def _check_paths(self) -> dict:
+        """Return model path existence, cached for PATH_CHECK_TTL seconds"""
+        cache = self._path_cache
+        now = time.monotonic()
+        if not cache or now - cache['checked_at'] > self.PATH_CHECK_TTL:
+            cache.update(
+                ckpt_exists=os.path.exists(self.CKPT_DIR),
+                wav2vec_exists=os.path.exists(self.WAV2VEC_DIR),
+                checked_at=now
+            )
+        return cache
+
     def _validate_paths(self):
         """Validate that model paths exist"""
-        if not os.path.exists(self.CKPT_DIR):
+        paths = self._check_paths()
+        if not paths['ckpt_exists']:
             print(f"Warning: Checkpoint directory not found: {self.CKPT_DIR}")
             print("Please update MULTITALK_CKPT_DIR environment variable or ensure models are downloaded")
-        
-        if not os.path.exists(self.WAV2VEC_DIR):
+
+        if not paths['wav2vec_exists']:
             print(f"Warning: Wav2Vec directory not found: {self.WAV2VEC_DIR}")
             print("Please update MULTITALK_WAV2VEC_DIR environment variable or ensure models are downloaded")
-    
+
     def get_model_info(self) -> dict:
         """Get information about model availability"""
+        paths = self._check_paths()
         return {
             'ckpt_dir': self.CKPT_DIR,
             'wav2vec_dir': self.WAV2VEC_DIR,
-            'ckpt_exists': os.path.exists(self.CKPT_DIR),
-            'wav2vec_exists': os.path.exists(self.WAV2VEC_DIR),
+            'ckpt_exists': paths['ckpt_exists'],
+            'wav2vec_exists': paths['wav2vec_exists'],
             'device_id': self.DEVICE_ID
         }
 
-# Global configuration instance
-config = DemoConfig()
+@functools.lru_cache(maxsize=None)
+def get_config() -> DemoConfig:
+    """Get the shared configuration instance, created on first use"""
+    return DemoConfig()
+
+def __getattr__(name):
+    # Keep `from config import config` working without touching the filesystem at import
+    if name == 'config':
+        return get_config()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
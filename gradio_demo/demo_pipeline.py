@@ -1,33 +1,80 @@
 import os
 import sys
-import json
+import copy
+import functools
+import subprocess
+import shutil
 import tempfile
 import logging
-import traceback
-from pathlib import Path
-from typing import Dict, Any, Optional, Callable
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional, Callable, Tuple
 import torch
 import random
 import numpy as np
+import soundfile as sf
 
 # Add the parent directory to sys.path to import wan modules
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
 
 from wan.configs import WAN_CONFIGS
 import wan
 from transformers import Wav2Vec2FeatureExtractor
 from src.audio_analysis.wav2vec2 import Wav2Vec2Model
-from wan.utils.multitalk_utils import save_video_ffmpeg
-from utils import audio_prepare_single, audio_prepare_multi, get_embedding
+from utils import audio_prepare_single, audio_prepare_multi, get_embedding, get_embedding_batched
 from progress_capture import progress_tracker
 from queue_manager import queue_manager
 
 logger = logging.getLogger(__name__)
 
+# Below this much free VRAM, weights are moved to CPU between generation stages
+OFFLOAD_FREE_VRAM_BYTES = 8 << 30
+
+# GPU-resident audio encoders shared by all pipeline instances in the process,
+# keyed by (wav2vec_dir, device_id)
+_AUDIO_ENC_CACHE: Dict[Tuple[str, int], Tuple[Wav2Vec2Model, Wav2Vec2FeatureExtractor]] = {}
+_AUDIO_ENC_LOCK = threading.Lock()
+
+@functools.lru_cache(maxsize=4)
+def _get_feature_extractor(wav2vec_dir: str) -> Wav2Vec2FeatureExtractor:
+    """Load the wav2vec2 feature extractor config once per directory"""
+    return Wav2Vec2FeatureExtractor.from_pretrained(wav2vec_dir, local_files_only=True)
+
+def _load_audio_encoder(wav2vec_dir: str, device_id: int, device: torch.device) -> Tuple[Wav2Vec2Model, Wav2Vec2FeatureExtractor]:
+    """Load the wav2vec2 encoder and feature extractor once per (directory, device)"""
+    key = (os.path.abspath(wav2vec_dir), device_id)
+    with _AUDIO_ENC_LOCK:
+        if key not in _AUDIO_ENC_CACHE:
+            # bf16 halves activation memory and roughly doubles encoder throughput;
+            # embeddings are converted back to float32 for the pipeline
+            audio_encoder = Wav2Vec2Model.from_pretrained(
+                wav2vec_dir, 
+                local_files_only=True
+            ).to(device, dtype=torch.bfloat16)
+            audio_encoder.feature_extractor._freeze_parameters()
+            audio_encoder.eval()
+            
+            wav2vec_feature_extractor = _get_feature_extractor(key[0])
+            _AUDIO_ENC_CACHE[key] = (audio_encoder, wav2vec_feature_extractor)
+        else:
+            logger.info("Reusing cached audio encoder")
+        return _AUDIO_ENC_CACHE[key]
+
 class GradioMultiTalkPipeline:
     """Wrapper around MultiTalk pipeline for Gradio demo"""
     
-    def __init__(self, ckpt_dir: str, wav2vec_dir: str, device_id: int = 0):
+    def __init__(
+        self,
+        ckpt_dir: str,
+        wav2vec_dir: str,
+        device_id: int = 0,
+        compile_model: bool = True,
+        deterministic: bool = False,
+        offload_model: Optional[bool] = None,
+        vae_tile_size: int = 256
+    ):
         """
         Initialize the MultiTalk pipeline
         
@@ -35,11 +82,34 @@ class GradioMultiTalkPipeline:
             ckpt_dir: Path to model checkpoints
             wav2vec_dir: Path to wav2vec model
             device_id: GPU device ID
+            compile_model: Compile the DiT denoiser and audio encoder with torch.compile
+                and run a warmup generation so compilation happens before the first request
+            deterministic: Use deterministic cuDNN kernels so a fixed seed reproduces the
+                same video. Off by default because it rules out the fastest kernels
+            offload_model: Move weights to CPU between generation stages. None decides
+                per request from free VRAM (see OFFLOAD_FREE_VRAM_BYTES)
+            vae_tile_size: Run the VAE in fp16 and decode in overlapping tiles of this many
+                pixels to cut peak memory on long videos. 0 keeps the fp32 full-frame decoder
+                
+        Raises:
+            RuntimeError: If CUDA is not available
         """
+        # The pipeline (bf16 autocast, CUDA seeding, cache management) is GPU-only
+        if not torch.cuda.is_available():
+            raise RuntimeError("MultiTalk requires a CUDA-capable GPU")
+        
+        # Expandable segments reduce fragmentation from per-job allocations of varying
+        # size; this only takes effect if set before the CUDA allocator is initialized
+        os.environ.setdefault('PYTORCH_CUDA_ALLOC_CONF', 'expandable_segments:True')
+        
         self.ckpt_dir = ckpt_dir
         self.wav2vec_dir = wav2vec_dir
         self.device_id = device_id
-        self.device = torch.device(f"cuda:{device_id}" if torch.cuda.is_available() else "cpu")
+        self.compile_model = compile_model
+        self.deterministic = deterministic
+        self.offload_model = offload_model
+        self.vae_tile_size = vae_tile_size
+        self.device = torch.device(f"cuda:{device_id}")
         
         # Initialize components
         self.pipeline = None
@@ -47,8 +117,22 @@ class GradioMultiTalkPipeline:
         self.audio_encoder = None
         self.temp_dir = tempfile.mkdtemp(prefix="multitalk_pipeline_")
         
+        # Let cuDNN/cuBLAS pick the fastest (TF32 / autotuned) kernels unless
+        # reproducibility was explicitly requested
+        torch.backends.cuda.matmul.allow_tf32 = True
+        torch.backends.cudnn.allow_tf32 = True
+        torch.backends.cudnn.benchmark = not deterministic
+        if deterministic:
+            torch.backends.cudnn.deterministic = True
+            torch.use_deterministic_algorithms(True, warn_only=True)
+        # Background writer for files that are only needed at the muxing stage
+        self._io_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="multitalk_io")
+        
         logger.info(f"Pipeline initialized with device: {self.device}")
         self._initialize_components()
+        
+        if self.compile_model:
+            self._warmup()
     
     def _initialize_components(self):
         """Initialize the MultiTalk components"""
@@ -61,15 +145,8 @@ class GradioMultiTalkPipeline:
             
             # Initialize audio encoder
             logger.info("Initializing audio encoder...")
-            self.audio_encoder = Wav2Vec2Model.from_pretrained(
-                self.wav2vec_dir, 
-                local_files_only=True
-            ).to(self.device)
-            self.audio_encoder.feature_extractor._freeze_parameters()
-            
-            self.wav2vec_feature_extractor = Wav2Vec2FeatureExtractor.from_pretrained(
-                self.wav2vec_dir, 
-                local_files_only=True
+            self.audio_encoder, self.wav2vec_feature_extractor = _load_audio_encoder(
+                self.wav2vec_dir, self.device_id, self.device
             )
             
             # Initialize MultiTalk pipeline
@@ -87,20 +164,82 @@ class GradioMultiTalkPipeline:
                 t5_cpu=False,
             )
             
+            if self.vae_tile_size:
+                # Decoding is the peak-memory point for long videos; fp16 applies to
+                # the decoder only, the conditioning encode keeps its precision
+                self.pipeline.vae.enable_tiling(self.vae_tile_size, dtype=torch.float16)
+            
+            # NDHWC layout lets the Conv3d patch embedding use Tensor Core kernels
+            self.pipeline.model = self.pipeline.model.to(memory_format=torch.channels_last_3d)
+            
+            if self.compile_model:
+                # The denoiser runs 3x per sampling step, so fusing kernels and cutting
+                # launch overhead there dominates; compilation itself is lazy. The audio
+                # encoder stays eager: its sequence length follows each request's audio,
+                # so CUDA graphs would re-record (and Dynamo recompile) on every new length
+                logger.info("Compiling DiT denoiser...")
+                self.pipeline.model = torch.compile(self.pipeline.model, mode="reduce-overhead")
+            
             logger.info("Pipeline components initialized successfully")
             
         except Exception as e:
-            logger.error(f"Failed to initialize pipeline components: {e}")
-            logger.error(traceback.format_exc())
+            logger.error(f"Failed to initialize pipeline components: {e}", exc_info=True)
             raise
     
+    def _should_offload(self) -> bool:
+        """Offload weights during generation only if requested or VRAM is short"""
+        if self.offload_model is not None:
+            return self.offload_model
+        free, _ = torch.cuda.mem_get_info(self.device_id)
+        return free < OFFLOAD_FREE_VRAM_BYTES
+    
+    def _warmup(self):
+        """Run a short generation on the bundled example to trigger compilation up front"""
+        cond_image = os.path.join(REPO_ROOT, 'examples', 'single', 'single1.png')
+        cond_audio = os.path.join(REPO_ROOT, 'examples', 'single', '1.wav')
+        if not (os.path.exists(cond_image) and os.path.exists(cond_audio)):
+            logger.warning("Warmup example not found, compilation will happen on the first request")
+            return
+        
+        try:
+            logger.info("Warming up compiled pipeline...")
+            input_data, _ = self._prepare_audio_embeddings({
+                'prompt': "A person is speaking.",
+                'cond_image': cond_image,
+                'cond_audio': {'person1': cond_audio}
+            })
+            with torch.inference_mode(), torch.autocast(self.device.type, dtype=torch.bfloat16):
+                self.pipeline.generate(
+                    input_data,
+                    size_buckget='multitalk-480',
+                    motion_frame=25,
+                    frame_num=81,
+                    shift=7.0,
+                    sampling_steps=2,
+                    seed=42,
+                    offload_model=self._should_offload(),
+                    max_frames_num=81,
+                    progress=False,
+                    deterministic=self.deterministic
+                )
+            logger.info("Warmup complete")
+        except Exception as e:
+            # A failed compile or CUDA-graph capture would fail every request the
+            # same way, so fall back to the eager denoiser
+            orig_model = getattr(self.pipeline.model, '_orig_mod', None)
+            if orig_model is not None:
+                self.pipeline.model = orig_model
+                logger.warning(f"Pipeline warmup failed, continuing with the eager DiT denoiser: {e}", exc_info=True)
+            else:
+                logger.warning(f"Pipeline warmup failed, continuing without it: {e}", exc_info=True)
+    
     def _prepare_audio_embeddings(self, input_data: Dict[str, Any]) -> tuple[Dict[str, Any], int]:
         """Prepare audio embeddings from audio files and calculate frame count"""
         try:
-            # Create audio save directory
+            # Create audio save directory (in the caller's per-request workdir when given)
             audio_save_dir = os.path.join(
-                self.temp_dir, 
-                f"audio_{random.randint(1000, 9999)}"
+                input_data.get('workdir', self.temp_dir), 
+                f"audio_{uuid.uuid4().hex[:8]}"
             )
             os.makedirs(audio_save_dir, exist_ok=True)
             
@@ -120,34 +259,27 @@ class GradioMultiTalkPipeline:
                 # Calculate audio duration from the combined audio
                 audio_duration = len(sum_human_speechs) / 16000  # 16kHz sample rate
                 
-                # Generate embeddings
-                audio_embedding_1 = get_embedding(
-                    new_human_speech1, 
-                    self.wav2vec_feature_extractor, 
-                    self.audio_encoder, 
-                    device=self.device
-                )
-                audio_embedding_2 = get_embedding(
-                    new_human_speech2, 
+                # Generate embeddings for both speakers in one encoder pass
+                audio_embedding_1, audio_embedding_2 = get_embedding_batched(
+                    [new_human_speech1, new_human_speech2], 
                     self.wav2vec_feature_extractor, 
                     self.audio_encoder, 
                     device=self.device
                 )
+                audio_embedding_1 = audio_embedding_1.float()
+                audio_embedding_2 = audio_embedding_2.float()
                 
-                # Save embeddings and audio
-                emb1_path = os.path.join(audio_save_dir, '1.pt')
-                emb2_path = os.path.join(audio_save_dir, '2.pt')
+                # Save the mixed audio for muxing; embeddings are handed to the
+                # pipeline in memory instead of through torch.save/torch.load
                 sum_audio_path = os.path.join(audio_save_dir, 'sum.wav')
                 
-                torch.save(audio_embedding_1, emb1_path)
-                torch.save(audio_embedding_2, emb2_path)
-                
-                import soundfile as sf
-                sf.write(sum_audio_path, sum_human_speechs, 16000)
+                input_data['_pending_io'] = [
+                    self._io_pool.submit(sf.write, sum_audio_path, sum_human_speechs, 16000)
+                ]
                 
                 # Update input data
-                input_data['cond_audio']['person1'] = emb1_path
-                input_data['cond_audio']['person2'] = emb2_path
+                input_data['cond_audio']['person1'] = audio_embedding_1
+                input_data['cond_audio']['person2'] = audio_embedding_2
                 input_data['video_audio'] = sum_audio_path
                 
             elif len(cond_audio) == 1:
@@ -163,18 +295,18 @@ class GradioMultiTalkPipeline:
                     self.audio_encoder, 
                     device=self.device
                 )
+                audio_embedding = audio_embedding.float()
                 
-                # Save embedding and audio
-                emb_path = os.path.join(audio_save_dir, '1.pt')
+                # Save the audio for muxing; the embedding is handed to the
+                # pipeline in memory instead of through torch.save/torch.load
                 sum_audio_path = os.path.join(audio_save_dir, 'sum.wav')
                 
-                torch.save(audio_embedding, emb_path)
-                
-                import soundfile as sf
-                sf.write(sum_audio_path, human_speech, 16000)
+                input_data['_pending_io'] = [
+                    self._io_pool.submit(sf.write, sum_audio_path, human_speech, 16000)
+                ]
                 
                 # Update input data
-                input_data['cond_audio']['person1'] = emb_path
+                input_data['cond_audio']['person1'] = audio_embedding
                 input_data['video_audio'] = sum_audio_path
             
             # Calculate frame count based on audio duration (25 FPS)
@@ -217,8 +349,7 @@ class GradioMultiTalkPipeline:
             return input_data, calculated_frame_num
             
         except Exception as e:
-            logger.error(f"Audio embedding preparation failed: {e}")
-            logger.error(traceback.format_exc())
+            logger.error(f"Audio embedding preparation failed: {e}", exc_info=True)
             raise
     
     def generate(
@@ -237,7 +368,8 @@ class GradioMultiTalkPipeline:
         Generate video using MultiTalk pipeline with enhanced progress tracking
         
         Args:
-            input_data: Input configuration dictionary
+            input_data: Input configuration dictionary. An optional ``workdir``
+                entry redirects intermediate files to a caller-owned directory
             sampling_steps: Number of sampling steps
             text_guide_scale: Text guidance scale
             audio_guide_scale: Audio guidance scale
@@ -248,7 +380,8 @@ class GradioMultiTalkPipeline:
             job_id: Job ID for queue tracking
             
         Returns:
-            Path to generated video file
+            Path to the generated video file. The file is checked to exist before
+            returning; any failure raises instead of returning a path
         """
         # Create job ID if not provided
         if job_id is None:
@@ -272,7 +405,6 @@ class GradioMultiTalkPipeline:
                 torch.cuda.manual_seed_all(seed)
                 np.random.seed(seed)
                 random.seed(seed)
-                torch.backends.cudnn.deterministic = True
                 
                 logger.info(f"Starting video generation with seed: {seed}")
                 queue_manager.update_job_progress(job_id, 0.1, "Initializing generation...")
@@ -283,7 +415,7 @@ class GradioMultiTalkPipeline:
                 # Prepare audio embeddings and calculate frame count
                 logger.info("Preparing audio embeddings...")
                 queue_manager.update_job_progress(job_id, 0.2, "Processing audio embeddings...")
-                processed_input_data, calculated_frame_num = self._prepare_audio_embeddings(input_data.copy())
+                processed_input_data, calculated_frame_num = self._prepare_audio_embeddings(copy.deepcopy(input_data))
                 
                 # Use calculated frame number instead of the UI parameter
                 actual_frame_num = calculated_frame_num
@@ -297,20 +429,22 @@ class GradioMultiTalkPipeline:
                 queue_manager.update_job_progress(job_id, 0.3, f"Generating {actual_frame_num} video frames...")
                 
                 # Enable progress tracking in the pipeline
-                video_tensor = self.pipeline.generate(
-                    processed_input_data,
-                    size_buckget='multitalk-480',
-                    motion_frame=25,
-                    frame_num=actual_frame_num,
-                    shift=7.0,
-                    sampling_steps=sampling_steps,
-                    text_guide_scale=text_guide_scale,
-                    audio_guide_scale=audio_guide_scale,
-                    seed=seed,
-                    offload_model=True,
-                    max_frames_num=actual_frame_num,
-                    progress=True  # Enable progress tracking
-                )
+                with torch.inference_mode(), torch.autocast(self.device.type, dtype=torch.bfloat16):
+                    video_tensor = self.pipeline.generate(
+                        processed_input_data,
+                        size_buckget='multitalk-480',
+                        motion_frame=25,
+                        frame_num=actual_frame_num,
+                        shift=7.0,
+                        sampling_steps=sampling_steps,
+                        text_guide_scale=text_guide_scale,
+                        audio_guide_scale=audio_guide_scale,
+                        seed=seed,
+                        offload_model=self._should_offload(),
+                        max_frames_num=actual_frame_num,
+                        progress=True,  # Enable progress tracking
+                        deterministic=self.deterministic
+                    )
                 
                 if progress_callback:
                     progress_callback(0.8)
@@ -321,7 +455,8 @@ class GradioMultiTalkPipeline:
                 # Save video
                 logger.info("Saving video...")
                 queue_manager.update_job_progress(job_id, 0.8, "Saving video file...")
-                output_filename = f"multitalk_output_{random.randint(1000, 9999)}"
+                # uuid rather than the just-seeded RNG, so concurrent jobs never collide
+                output_filename = f"multitalk_output_{uuid.uuid4().hex[:8]}"
                 output_path = os.path.join(self.temp_dir, f"{output_filename}.mp4")
                 
                 # Use the video audio if available
@@ -329,13 +464,11 @@ class GradioMultiTalkPipeline:
                 if 'video_audio' in processed_input_data:
                     audio_files = [processed_input_data['video_audio']]
                 
-                save_video_ffmpeg(video_tensor, output_filename, audio_files)
+                # The audio track was written in the background during sampling
+                for future in processed_input_data.pop('_pending_io', []):
+                    future.result()
                 
-                # Move to temp directory if not already there
-                generated_file = f"{output_filename}.mp4"
-                if os.path.exists(generated_file) and not os.path.exists(output_path):
-                    import shutil
-                    shutil.move(generated_file, output_path)
+                self._save_video(video_tensor, output_path, audio_files)
                 
                 if progress_callback:
                     progress_callback(1.0)
@@ -351,23 +484,65 @@ class GradioMultiTalkPipeline:
                     
         except Exception as e:
             error_msg = f"Video generation failed: {e}"
-            logger.error(error_msg)
-            logger.error(traceback.format_exc())
+            logger.error(error_msg, exc_info=True)
             queue_manager.complete_job(job_id, success=False, error_message=str(e))
             raise
     
+    def _save_video(self, video_tensor: torch.Tensor, output_path: str, audio_files: list, fps: int = 25):
+        """
+        Encode the video and mux its audio in a single ffmpeg pass
+        
+        Raw RGB frames are piped over stdin, so no intermediate video file is
+        written and nothing has to be moved afterwards.
+        
+        Args:
+            video_tensor: Generated video in [-1, 1], shape (C, T, H, W)
+            output_path: Destination .mp4 path
+            audio_files: Audio tracks to mux (only the first is used)
+            fps: Output frame rate
+        """
+        frames = ((video_tensor + 1) * 127.5).clamp(0, 255).to(torch.uint8)
+        frames = frames.permute(1, 2, 3, 0).contiguous().cpu().numpy()  # T H W C
+        n_frames, height, width, _ = frames.shape
+        
+        command = [
+            "ffmpeg", "-y", "-loglevel", "error",
+            "-f", "rawvideo", "-pix_fmt", "rgb24",
+            "-s", f"{width}x{height}", "-r", str(fps),
+            "-i", "-",
+        ]
+        if audio_files:
+            # Trim the audio to the video length; frame_num is rounded up to 4n+1,
+            # so the video may outlast the audio and every frame must be kept
+            command += ["-t", f"{n_frames / fps}", "-i", audio_files[0]]
+        command += ["-c:v", "libx264", "-pix_fmt", "yuv420p"]
+        if audio_files:
+            command += ["-c:a", "aac"]
+        command.append(output_path)
+        
+        proc = subprocess.Popen(command, stdin=subprocess.PIPE, bufsize=1 << 20)
+        try:
+            proc.stdin.write(memoryview(frames))
+        except BrokenPipeError:
+            pass  # ffmpeg exited early; its return code is reported below
+        finally:
+            proc.stdin.close()
+        if proc.wait() != 0:
+            raise RuntimeError(f"ffmpeg failed with exit code {proc.returncode}")
+    
     def cleanup(self):
         """Clean up temporary files and resources"""
         try:
             if hasattr(self, 'temp_dir') and os.path.exists(self.temp_dir):
-                import shutil
                 shutil.rmtree(self.temp_dir)
                 logger.info(f"Cleaned up temporary directory: {self.temp_dir}")
             
+            if hasattr(self, '_io_pool'):
+                self._io_pool.shutdown(wait=True)
+            
             # Clear GPU memory
-            if torch.cuda.is_available():
-                torch.cuda.empty_cache()
-                torch.cuda.ipc_collect()
+            torch.cuda.empty_cache()
+            torch.cuda.ipc_collect()
                 
         except Exception as e:
             logger.error(f"Cleanup error: {e}")
@@ -1,24 +1,139 @@
 import os
+import math
+import importlib
 import tempfile
 import shutil
 import logging
+import threading
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import Dict, Optional, Tuple
 from PIL import Image
 import numpy as np
+import soundfile as sf
+from scipy.signal import resample_poly
 
 logger = logging.getLogger(__name__)
 
+class _LazyModule:
+    """Module proxy that defers the (slow) import until first attribute access"""
+    
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+    
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+# Only needed on fallback/normalization paths and slow to import
+librosa = _LazyModule('librosa')
+pyln = _LazyModule('pyloudnorm')
+
+def _load_audio(audio_path: str, sample_rate: Optional[int] = None, max_duration: Optional[float] = None) -> Tuple[np.ndarray, int]:
+    """
+    Load a mono float32 waveform, decoding with libsndfile where possible
+    
+    Args:
+        audio_path: Path to audio file
+        sample_rate: Resample to this rate (None keeps the native rate)
+        max_duration: Stop reading after this many seconds (None reads everything)
+        
+    Returns:
+        Tuple of (audio, sample_rate)
+    """
+    try:
+        with sf.SoundFile(audio_path) as f:
+            sr = f.samplerate
+            frames = f.frames if max_duration is None else min(f.frames, int(max_duration * sr))
+            audio = f.read(frames, dtype='float32', always_2d=True)
+    except RuntimeError:
+        # Containers libsndfile cannot decode (e.g. m4a/aac) go through librosa
+        return librosa.load(audio_path, sr=sample_rate, duration=max_duration)
+    
+    audio = audio.mean(axis=1) if audio.shape[1] > 1 else audio[:, 0]
+    if sample_rate is not None and sr != sample_rate:
+        g = math.gcd(sr, sample_rate)
+        audio = resample_poly(audio, sample_rate // g, sr // g).astype(np.float32, copy=False)
+        sr = sample_rate
+    return audio, sr
+
+def _shm_temp_root(min_free_bytes: int = 500 * 1024 * 1024) -> Optional[str]:
+    """Return /dev/shm when it is a usable tmpfs with enough free space, else None"""
+    shm = '/dev/shm'
+    try:
+        if os.path.isdir(shm) and os.access(shm, os.W_OK) and shutil.disk_usage(shm).free > min_free_bytes:
+            return shm
+    except OSError:
+        pass
+    return None
+
+def _peak(audio: np.ndarray) -> float:
+    """Peak absolute amplitude, without allocating an abs() copy of the signal"""
+    return max(float(audio.max()), -float(audio.min()))
+
+def _is_silent(audio_path: str, sample_rate: int, block_seconds: float = 5.0) -> bool:
+    """Scan an audio file block by block, stopping at the first block with signal"""
+    blocksize = max(1, int(sample_rate * block_seconds))
+    for block in sf.blocks(audio_path, blocksize=blocksize, dtype='float32'):
+        if _peak(block) >= 1e-6:
+            return False
+    return True
+
 class InputProcessor:
     """Handles input validation and preprocessing for the Gradio demo"""
     
     def __init__(self):
-        self.temp_dir = tempfile.mkdtemp(prefix="multitalk_inputs_")
+        # Processed inputs are read straight back by the pipeline, so keep them in RAM when possible
+        self.temp_dir = tempfile.mkdtemp(prefix="multitalk_inputs_", dir=_shm_temp_root())
         self.supported_image_formats = {'.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.webp'}
         self.supported_audio_formats = {'.wav', '.mp3', '.m4a', '.flac', '.aac', '.ogg'}
         self.max_image_size = (2048, 2048)  # Max resolution
         self.max_audio_duration = 60  # Max duration in seconds
         
+        # Processed files are encoded and written in the background; callers wait
+        # on them with wait_for_write() just before the files are read
+        self._io_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="multitalk_inputs_io")
+        self._pending_writes: Dict[str, Future] = {}
+        self._pending_lock = threading.Lock()
+        
+    def _write_async(self, path: str, write_fn, *args, **kwargs):
+        """Run a file write on the I/O pool and remember it under its path until it is done"""
+        future = self._io_pool.submit(write_fn, *args, **kwargs)
+        with self._pending_lock:
+            self._pending_writes[path] = future
+        # Successful writes need no further tracking; failed ones stay until a
+        # wait_for_write() call reports them
+        def on_done(f: Future):
+            if f.exception() is None:
+                self._forget_write(path, f)
+        future.add_done_callback(on_done)
+    
+    def _forget_write(self, path: str, future: Future):
+        """Stop tracking a write, unless path has since been resubmitted"""
+        with self._pending_lock:
+            if self._pending_writes.get(path) is future:
+                del self._pending_writes[path]
+    
+    def wait_for_write(self, path: str):
+        """
+        Block until a processed file has been written (no-op for other paths)
+        
+        Raises:
+            ValueError: If the background write failed
+        """
+        with self._pending_lock:
+            future = self._pending_writes.get(path)
+        if future is None:
+            return
+        try:
+            future.result()
+        except Exception as e:
+            self._forget_write(path, future)
+            raise ValueError(f"Failed to write processed file {path}: {e}") from e
+    
     def validate_image(self, image_path: str) -> Tuple[bool, str]:
         """
         Validate image file
@@ -38,20 +153,20 @@ class InputProcessor:
             if ext not in self.supported_image_formats:
                 return False, f"Unsupported image format: {ext}. Supported formats: {', '.join(self.supported_image_formats)}"
             
-            # Try to open and validate image
+            # Try to open and validate image; Image.open only parses the header,
+            # pixel data is decoded (and decode errors raised) in process_image
             try:
                 with Image.open(image_path) as img:
-                    # Check image size
-                    if img.size[0] > self.max_image_size[0] or img.size[1] > self.max_image_size[1]:
-                        return False, f"Image too large. Maximum size: {self.max_image_size[0]}x{self.max_image_size[1]}"
-                    
-                    # Check if image has valid dimensions
-                    if img.size[0] < 64 or img.size[1] < 64:
-                        return False, "Image too small. Minimum size: 64x64"
-                    
-                    # Check if image can be converted to RGB
-                    img.convert('RGB')
-                    
+                    width, height = img.size
+                
+                # Check image size
+                if width > self.max_image_size[0] or height > self.max_image_size[1]:
+                    return False, f"Image too large. Maximum size: {self.max_image_size[0]}x{self.max_image_size[1]}"
+                
+                # Check if image has valid dimensions
+                if width < 64 or height < 64:
+                    return False, "Image too small. Minimum size: 64x64"
+                
             except Exception as e:
                 return False, f"Invalid image file: {str(e)}"
             
@@ -80,13 +195,19 @@ class InputProcessor:
             if ext not in self.supported_audio_formats:
                 return False, f"Unsupported audio format: {ext}. Supported formats: {', '.join(self.supported_audio_formats)}"
             
-            # Try to load audio file to validate
+            # Validate from the file header where possible; only containers
+            # libsndfile cannot read (e.g. m4a/aac) are decoded up front
             try:
-                import librosa
-                audio, sr = librosa.load(audio_path, sr=None)
+                try:
+                    info = sf.info(audio_path)
+                    audio, sr = None, info.samplerate
+                    duration = info.frames / sr
+                except RuntimeError:
+                    # Reading slightly past the limit is enough to reject long files
+                    audio, sr = _load_audio(audio_path, max_duration=self.max_audio_duration + 1)
+                    duration = len(audio) / sr
                 
                 # Check duration
-                duration = len(audio) / sr
                 if duration > self.max_audio_duration:
                     return False, f"Audio too long. Maximum duration: {self.max_audio_duration} seconds"
                 
@@ -94,7 +215,8 @@ class InputProcessor:
                     return False, "Audio too short. Minimum duration: 0.5 seconds"
                 
                 # Check if audio has content
-                if np.max(np.abs(audio)) < 1e-6:
+                silent = _peak(audio) < 1e-6 if audio is not None else _is_silent(audio_path, sr)
+                if silent:
                     return False, "Audio appears to be silent"
                 
             except Exception as e:
@@ -114,7 +236,7 @@ class InputProcessor:
             image_path: Path to input image
             
         Returns:
-            Path to processed image
+            Path to processed image, written in the background (see wait_for_write)
         """
         try:
             # Validate image first
@@ -122,21 +244,30 @@ class InputProcessor:
             if not is_valid:
                 raise ValueError(error_msg)
             
-            # Copy image to temp directory with standardized name
-            processed_path = os.path.join(self.temp_dir, f"processed_image_{os.path.basename(image_path)}")
+            # Copy image to temp directory under a unique name: uploads from different
+            # sessions can share a basename, and callers memoize the returned path
+            processed_path = os.path.join(self.temp_dir, f"processed_image_{uuid.uuid4().hex[:8]}_{os.path.basename(image_path)}")
             
             # Open, process and save image
             with Image.open(image_path) as img:
+                # Let libjpeg decode at a reduced DCT scale when the image is much
+                # larger than needed (no-op for other formats)
+                img.draft('RGB', self.max_image_size)
+                img.load()
+                
                 # Convert to RGB if necessary
                 if img.mode != 'RGB':
                     img = img.convert('RGB')
                 
                 # Resize if too large (maintain aspect ratio)
                 if img.size[0] > self.max_image_size[0] or img.size[1] > self.max_image_size[1]:
-                    img.thumbnail(self.max_image_size, Image.Resampling.LANCZOS)
+                    # reducing_gap box-reduces by an integer factor first so LANCZOS
+                    # only handles the final, fractional part of the downscale
+                    img.thumbnail(self.max_image_size, Image.Resampling.LANCZOS, reducing_gap=2.0)
                 
-                # Save processed image
-                img.save(processed_path, 'PNG', quality=95)
+                # Save processed image; it is a short-lived intermediate, so favour
+                # encode speed over size (PNG has no quality setting)
+                self._write_async(processed_path, img.save, processed_path, 'PNG', compress_level=1)
             
             logger.info(f"Image processed successfully: {processed_path}")
             return processed_path
@@ -153,7 +284,7 @@ class InputProcessor:
             audio_path: Path to input audio
             
         Returns:
-            Path to processed audio
+            Path to processed audio, written in the background (see wait_for_write)
         """
         try:
             # Validate audio first
@@ -161,29 +292,26 @@ class InputProcessor:
             if not is_valid:
                 raise ValueError(error_msg)
             
-            # Copy audio to temp directory
-            processed_path = os.path.join(self.temp_dir, f"processed_audio_{os.path.basename(audio_path)}")
-            
-            # Convert audio to standard format (16kHz WAV)
-            import librosa
-            import soundfile as sf
+            # Copy audio to temp directory under a unique name (see process_image)
+            processed_path = os.path.join(self.temp_dir, f"processed_audio_{uuid.uuid4().hex[:8]}_{os.path.basename(audio_path)}")
             
-            # Load audio
-            audio, sr = librosa.load(audio_path, sr=16000)
+            # Load audio as 16kHz mono
+            audio, sr = _load_audio(audio_path, sample_rate=16000)
             
             # Normalize audio
-            import pyloudnorm as pyln
             meter = pyln.Meter(16000)
             loudness = meter.integrated_loudness(audio)
             
             if abs(loudness) <= 100:  # Valid loudness measurement
-                normalized_audio = pyln.normalize.loudness(audio, loudness, -23.0)
+                # Loudness normalization is a single scalar gain to -23 LUFS
+                normalized_audio = audio * np.float32(10.0 ** ((-23.0 - loudness) / 20.0))
             else:
-                # Fallback normalization
-                normalized_audio = audio / (np.max(np.abs(audio)) + 1e-8) * 0.8
+                # Fallback normalization, in place: audio is our own decoded buffer
+                np.multiply(audio, 0.8 / (_peak(audio) + 1e-8), out=audio)
+                normalized_audio = audio
             
             # Save processed audio
-            sf.write(processed_path, normalized_audio, 16000)
+            self._write_async(processed_path, sf.write, processed_path, normalized_audio, 16000)
             
             logger.info(f"Audio processed successfully: {processed_path}")
             return processed_path
@@ -195,6 +323,8 @@ class InputProcessor:
     def cleanup(self):
         """Clean up temporary files"""
         try:
+            self._io_pool.shutdown(wait=True)
+            
             if os.path.exists(self.temp_dir):
                 shutil.rmtree(self.temp_dir)
                 logger.info(f"Cleaned up input processor temp directory: {self.temp_dir}")
@@ -7,6 +7,7 @@ import os
 import sys
 import subprocess
 import argparse
+import importlib.util
 from pathlib import Path
 
 def check_requirements():
@@ -16,12 +17,12 @@ def check_requirements():
         'soundfile', 'pyloudnorm', 'PIL'
     ]
     
-    missing_packages = []
-    for package in required_packages:
-        try:
-            __import__(package)
-        except ImportError:
-            missing_packages.append(package)
+    # find_spec only locates the package; importing torch & co. here would
+    # cost seconds of startup just to throw the modules away
+    missing_packages = [
+        package for package in required_packages
+        if importlib.util.find_spec(package) is None
+    ]
     
     if missing_packages:
         print(f"❌ Missing required packages: {', '.join(missing_packages)}")
@@ -32,13 +33,24 @@ def check_requirements():
     print("✅ All required packages are installed")
     return True
 
+def _list_dir(directory):
+    """Return the set of entry names in a directory, or None if it cannot be read"""
+    try:
+        with os.scandir(directory) as entries:
+            return {entry.name for entry in entries}
+    except OSError:
+        return None
+
 def check_models(ckpt_dir, wav2vec_dir):
     """Check if model files exist"""
-    if not os.path.exists(ckpt_dir):
+    # One directory listing each instead of a stat per file (slow on network filesystems)
+    ckpt_files = _list_dir(ckpt_dir)
+    if ckpt_files is None:
         print(f"❌ Checkpoint directory not found: {ckpt_dir}")
         return False
     
-    if not os.path.exists(wav2vec_dir):
+    wav2vec_files = _list_dir(wav2vec_dir)
+    if wav2vec_files is None:
         print(f"❌ Wav2Vec directory not found: {wav2vec_dir}")
         return False
     
@@ -50,11 +62,12 @@ def check_models(ckpt_dir, wav2vec_dir):
         (wav2vec_dir, 'config.json')
     ]
     
-    missing_files = []
-    for directory, filename in key_files:
-        filepath = os.path.join(directory, filename)
-        if not os.path.exists(filepath):
-            missing_files.append(filepath)
+    dir_files = {ckpt_dir: ckpt_files, wav2vec_dir: wav2vec_files}
+    missing_files = [
+        os.path.join(directory, filename)
+        for directory, filename in key_files
+        if filename not in dir_files[directory]
+    ]
     
     if missing_files:
         print(f"❌ Missing model files:")
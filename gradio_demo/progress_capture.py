@@ -9,13 +9,37 @@ import re
 import time
 import threading
 import contextlib
+import functools
+import itertools
+from collections import deque
 from typing import Optional, Callable, Dict, Any, List
 from dataclasses import dataclass
 import logging
-from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
+# Substrings that mark a stdout line as progress output rather than a log line
+_PROGRESS_HINT_RE = re.compile(r'%|it/s|step|epoch', re.IGNORECASE)
+
+# (epoch second, "HH:MM:SS") of the last formatted timestamp
+_last_timestamp = (None, '')
+
+def _timestamp() -> str:
+    """Current local time as HH:MM:SS, formatted at most once per second"""
+    global _last_timestamp
+    now = int(time.time())
+    second, text = _last_timestamp
+    if now != second:
+        t = time.localtime(now)
+        text = f"{t.tm_hour:02d}:{t.tm_min:02d}:{t.tm_sec:02d}"
+        # Single tuple assignment, so concurrent readers never see a torn pair
+        _last_timestamp = (now, text)
+    return text
+
+def _tail(lines: deque, max_lines: int) -> List[str]:
+    """Return the last max_lines entries of a deque as a list"""
+    return list(itertools.islice(lines, max(0, len(lines) - max_lines), None))
+
 @dataclass
 class ProgressInfo:
     """Information about current progress"""
@@ -27,18 +51,33 @@ class ProgressInfo:
     description: str = ""
     elapsed_time: float = 0.0
 
+@functools.lru_cache(maxsize=512)
+def _parse_time(time_str: str) -> float:
+    """Parse time string like '01:23' to seconds (cached; tqdm repeats the same strings)"""
+    try:
+        if ':' in time_str:
+            parts = time_str.split(':')
+            if len(parts) == 2:
+                return int(parts[0]) * 60 + int(parts[1])
+            elif len(parts) == 3:
+                return int(parts[0]) * 3600 + int(parts[1]) * 60 + int(parts[2])
+        return float(time_str.rstrip('s'))
+    except ValueError:
+        return 0.0
+
 class TqdmCapture:
     """Captures tqdm progress output"""
     
     def __init__(self):
-        self.captured_output = []
+        self.captured_output: deque = deque(maxlen=1000)
         self.current_progress = ProgressInfo()
         self.lock = threading.Lock()
         self.callbacks: List[Callable[[ProgressInfo], None]] = []
         
-        # Regex patterns for parsing tqdm output
+        # Regex patterns for parsing tqdm output; the bar itself is matched as
+        # "anything but |" so the pattern does not depend on the bar glyphs
         self.tqdm_pattern = re.compile(
-            r'(\d+)%\|[█▉▊▋▌▍▎▏ ]*\|\s*(\d+)/(\d+)\s*\[([^\]]+)<([^\]]+),\s*([^\]]+)\]'
+            r'(\d+)%\|[^|]*\|\s*(\d+)/(\d+)\s*\[([^<\]]+)<([^,\]]+),\s*([^\]]+)\]'
         )
         self.simple_progress_pattern = re.compile(r'(\d+)%')
     
@@ -59,8 +98,8 @@ class TqdmCapture:
         if not line:
             return None
         
-        # Try full tqdm pattern first
-        match = self.tqdm_pattern.search(line)
+        # Try full tqdm pattern first; only tqdm bars contain '%|'
+        match = self.tqdm_pattern.search(line) if '%|' in line else None
         if match:
             percentage = float(match.group(1))
             current = int(match.group(2))
@@ -91,16 +130,7 @@ class TqdmCapture:
     
     def _parse_time(self, time_str: str) -> float:
         """Parse time string like '01:23' to seconds"""
-        try:
-            if ':' in time_str:
-                parts = time_str.split(':')
-                if len(parts) == 2:
-                    return int(parts[0]) * 60 + int(parts[1])
-                elif len(parts) == 3:
-                    return int(parts[0]) * 3600 + int(parts[1]) * 60 + int(parts[2])
-            return float(time_str.rstrip('s'))
-        except:
-            return 0.0
+        return _parse_time(time_str)
     
     def update_progress(self, line: str):
         """Update progress from a captured line"""
@@ -108,14 +138,15 @@ class TqdmCapture:
         if progress_info:
             with self.lock:
                 self.current_progress = progress_info
-                self.captured_output.append(f"[{datetime.now().strftime('%H:%M:%S')}] {line}")
-                
-                # Notify callbacks
-                for callback in self.callbacks:
-                    try:
-                        callback(progress_info)
-                    except Exception as e:
-                        logger.error(f"Progress callback error: {e}")
+                self.captured_output.append(f"[{_timestamp()}] {line}")
+                callbacks = tuple(self.callbacks)
+            
+            # Notify callbacks outside the lock so a slow callback cannot block readers
+            for callback in callbacks:
+                try:
+                    callback(progress_info)
+                except Exception as e:
+                    logger.error(f"Progress callback error: {e}")
     
     def get_current_progress(self) -> ProgressInfo:
         """Get current progress information"""
@@ -125,7 +156,7 @@ class TqdmCapture:
     def get_recent_output(self, max_lines: int = 50) -> List[str]:
         """Get recent captured output lines"""
         with self.lock:
-            return self.captured_output[-max_lines:]
+            return _tail(self.captured_output, max_lines)
     
     def clear_output(self):
         """Clear captured output"""
@@ -138,7 +169,10 @@ class LogCapture:
     
     def __init__(self, max_lines: int = 100):
         self.max_lines = max_lines
-        self.log_lines: List[str] = []
+        self.log_lines: deque = deque(maxlen=max_lines)
+        # Immutable copy of log_lines republished on every write, so readers
+        # never need the lock (reference assignment is atomic)
+        self._snapshot: tuple = ()
         self.lock = threading.Lock()
         self.callbacks: List[Callable[[str], None]] = []
     
@@ -149,43 +183,58 @@ class LogCapture:
     
     def add_log_line(self, line: str):
         """Add a new log line"""
-        timestamp = datetime.now().strftime('%H:%M:%S')
+        timestamp = _timestamp()
         formatted_line = f"[{timestamp}] {line}"
         
         with self.lock:
             self.log_lines.append(formatted_line)
-            if len(self.log_lines) > self.max_lines:
-                self.log_lines.pop(0)
-            
-            # Notify callbacks
-            for callback in self.callbacks:
-                try:
-                    callback(formatted_line)
-                except Exception as e:
-                    logger.error(f"Log callback error: {e}")
+            self._snapshot = tuple(self.log_lines)
+            callbacks = tuple(self.callbacks)
+        
+        # Notify callbacks outside the lock so a slow callback cannot block readers
+        for callback in callbacks:
+            try:
+                callback(formatted_line)
+            except Exception as e:
+                logger.error(f"Log callback error: {e}")
+    
+    def snapshot(self) -> tuple:
+        """Current log lines as an immutable tuple; a new object after every change"""
+        return self._snapshot
     
     def get_recent_logs(self, max_lines: int = None) -> List[str]:
         """Get recent log lines"""
-        with self.lock:
-            if max_lines is None:
-                return self.log_lines.copy()
-            return self.log_lines[-max_lines:]
+        snapshot = self._snapshot
+        if max_lines is None:
+            return list(snapshot)
+        return list(snapshot[max(0, len(snapshot) - max_lines):])
     
     def clear_logs(self):
         """Clear all log lines"""
         with self.lock:
             self.log_lines.clear()
+            self._snapshot = ()
 
 class ProgressStreamCapture:
     """Context manager to capture stdout/stderr for progress monitoring"""
     
-    def __init__(self, tqdm_capture: TqdmCapture, log_capture: LogCapture):
+    def __init__(
+        self,
+        tqdm_capture: TqdmCapture,
+        log_capture: LogCapture,
+        progress_callback: Optional[Callable[[ProgressInfo], None]] = None
+    ):
         self.tqdm_capture = tqdm_capture
         self.log_capture = log_capture
+        # Job-scoped callback, unregistered when the capture ends
+        self.progress_callback = progress_callback
         self.original_stdout = None
         self.original_stderr = None
         self.captured_stdout = io.StringIO()
         self.captured_stderr = io.StringIO()
+        # Partial lines waiting for their terminator
+        self._stdout_buf = ''
+        self._stderr_buf = ''
     
     def __enter__(self):
         self.original_stdout = sys.stdout
@@ -200,6 +249,30 @@ class ProgressStreamCapture:
     def __exit__(self, exc_type, exc_val, exc_tb):
         sys.stdout = self.original_stdout
         sys.stderr = self.original_stderr
+        
+        # Process whatever was written without a trailing line terminator
+        stdout_tail, self._stdout_buf = self._stdout_buf, ''
+        stderr_tail, self._stderr_buf = self._stderr_buf, ''
+        self._handle_stdout_lines([stdout_tail])
+        self._handle_stderr_lines([stderr_tail])
+        
+        # Finished jobs must not keep receiving (and paying for) progress updates
+        if self.progress_callback is not None:
+            self.tqdm_capture.remove_callback(self.progress_callback)
+    
+    @staticmethod
+    def _split_complete_lines(pending: str, text: str):
+        """Append text to a pending partial line and split off the completed lines"""
+        buf = pending + text
+        # '\r' (tqdm redraws) and '\n' both terminate a line
+        end = max(buf.rfind('\n'), buf.rfind('\r'))
+        lines, tail = ([], buf) if end < 0 else (buf[:end].splitlines(), buf[end + 1:])
+        # tqdm writes each frame as '\r' + frame, so the frame's own terminator only
+        # arrives with the next redraw; a complete frame is handled right away
+        if '%|' in tail and tail.rstrip().endswith(']'):
+            lines.append(tail)
+            tail = ''
+        return lines, tail
     
     def _create_capture_stream(self, original_stream, processor):
         """Create a stream that captures and processes output"""
@@ -209,9 +282,11 @@ class ProgressStreamCapture:
                 self.processor = processor
             
             def write(self, text):
-                # Write to original stream
+                # Write to original stream; flush on line ends only (tqdm flushes
+                # its own redraws through flush() below)
                 self.original.write(text)
-                self.original.flush()
+                if '\n' in text:
+                    self.original.flush()
                 
                 # Process for progress capture
                 self.processor(text)
@@ -227,19 +302,25 @@ class ProgressStreamCapture:
     
     def _process_stdout(self, text: str):
         """Process stdout text for progress information"""
-        lines = text.split('\n')
+        lines, self._stdout_buf = self._split_complete_lines(self._stdout_buf, text)
+        self._handle_stdout_lines(lines)
+    
+    def _process_stderr(self, text: str):
+        """Process stderr text for error/warning information"""
+        lines, self._stderr_buf = self._split_complete_lines(self._stderr_buf, text)
+        self._handle_stderr_lines(lines)
+    
+    def _handle_stdout_lines(self, lines: List[str]):
         for line in lines:
             line = line.strip()
             if line:
                 # Check if it looks like a progress line
-                if any(indicator in line.lower() for indicator in ['%', 'it/s', 'step', 'epoch']):
+                if _PROGRESS_HINT_RE.search(line):
                     self.tqdm_capture.update_progress(line)
                 else:
                     self.log_capture.add_log_line(line)
     
-    def _process_stderr(self, text: str):
-        """Process stderr text for error/warning information"""
-        lines = text.split('\n')
+    def _handle_stderr_lines(self, lines: List[str]):
         for line in lines:
             line = line.strip()
             if line:
@@ -271,7 +352,7 @@ class EnhancedProgressTracker:
         
         self.tqdm_capture.add_callback(update_queue_progress)
         
-        return ProgressStreamCapture(self.tqdm_capture, self.log_capture)
+        return ProgressStreamCapture(self.tqdm_capture, self.log_capture, update_queue_progress)
     
     def add_job_callback(self, job_id: str, callback: Callable):
         """Add a callback for job progress updates"""
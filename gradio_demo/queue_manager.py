@@ -6,15 +6,17 @@ Provides queue visibility and job tracking functionality
 import time
 import json
 import threading
-from typing import Dict, List, Optional, Any
-from dataclasses import dataclass, asdict
+from types import MappingProxyType
+from typing import Deque, Dict, Optional, Any, Mapping, Tuple
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 import uuid
 import logging
+from collections import deque
 
 logger = logging.getLogger(__name__)
 
-@dataclass
+@dataclass(slots=True)
 class JobInfo:
     """Information about a queued job"""
     job_id: str
@@ -28,16 +30,40 @@ class JobInfo:
     current_step: str = ""
     estimated_duration: Optional[float] = None
     error_message: Optional[str] = None
+    
+    def to_view(self) -> Dict[str, Any]:
+        """Shallow dict of the fields the status display uses (created_at as HH:MM:SS)"""
+        return {
+            "job_id": self.job_id,
+            "job_type": self.job_type,
+            "status": self.status,
+            "progress": self.progress,
+            "current_step": self.current_step,
+            "created_at": self.created_at.strftime('%H:%M:%S')
+        }
 
 class QueueManager:
     """Manages job queue and provides status information"""
     
     def __init__(self):
         self.jobs: Dict[str, JobInfo] = {}
-        self.queue_order: List[str] = []
+        # Insertion-ordered set of queued job IDs: O(1) append and removal
+        self.queue_order: Dict[str, None] = {}
         self.active_job: Optional[str] = None
+        # Only writers take the lock; readers use the published snapshot
         self.lock = threading.Lock()
-        self.job_history: List[JobInfo] = []
+        self.job_history: Deque[JobInfo] = deque(maxlen=100)  # Keep last 100 jobs
+        
+        # Read-only (jobs, queue_order, active_job, positions) view, republished
+        # after every structural change. Progress updates mutate the shared JobInfo
+        # objects in place, so they show up without a republish
+        self._snapshot: Tuple[Mapping[str, JobInfo], Tuple[str, ...], Optional[str], Mapping[str, int]] = (
+            MappingProxyType({}), (), None, MappingProxyType({})
+        )
+        
+        # Bumped on every change visible in the queue display, so renderers can
+        # reuse their previous output while it is unchanged
+        self.version = 0
         
         # Performance tracking
         self.avg_processing_times = {
@@ -45,6 +71,18 @@ class QueueManager:
             "multi": 180.0    # Default 3 minutes
         }
     
+    def _publish(self):
+        """Publish a fresh snapshot for lock-free readers (call with the lock held)"""
+        self.version += 1
+        queue_order = tuple(self.queue_order)
+        positions = {job_id: i for i, job_id in enumerate(queue_order, start=1)}
+        self._snapshot = (
+            MappingProxyType(dict(self.jobs)),
+            queue_order,
+            self.active_job,
+            MappingProxyType(positions)
+        )
+    
     def add_job(self, job_type: str, user_session: str = None) -> str:
         """Add a new job to the queue"""
         job_id = str(uuid.uuid4())[:8]
@@ -63,7 +101,8 @@ class QueueManager:
         
         with self.lock:
             self.jobs[job_id] = job
-            self.queue_order.append(job_id)
+            self.queue_order[job_id] = None
+            self._publish()
         
         logger.info(f"Added job {job_id} to queue (type: {job_type})")
         return job_id
@@ -80,8 +119,8 @@ class QueueManager:
             self.active_job = job_id
             
             # Remove from queue order
-            if job_id in self.queue_order:
-                self.queue_order.remove(job_id)
+            self.queue_order.pop(job_id, None)
+            self._publish()
         
         logger.info(f"Started processing job {job_id}")
         return True
@@ -90,8 +129,12 @@ class QueueManager:
         """Update job progress"""
         with self.lock:
             if job_id in self.jobs:
-                self.jobs[job_id].progress = progress
-                self.jobs[job_id].current_step = current_step
+                job = self.jobs[job_id]
+                # The display shows whole percents, so finer changes keep the version
+                if int(job.progress * 100) != int(progress * 100) or job.current_step != current_step:
+                    self.version += 1
+                job.progress = progress
+                job.current_step = current_step
     
     def complete_job(self, job_id: str, success: bool = True, error_message: str = None):
         """Mark a job as completed"""
@@ -114,8 +157,6 @@ class QueueManager:
             
             # Move to history and clean up
             self.job_history.append(job)
-            if len(self.job_history) > 100:  # Keep last 100 jobs
-                self.job_history.pop(0)
             
             # Clear active job
             if self.active_job == job_id:
@@ -123,51 +164,50 @@ class QueueManager:
             
             # Clean up old job
             del self.jobs[job_id]
+            self._publish()
         
         logger.info(f"Completed job {job_id} (success: {success})")
     
     def get_queue_status(self) -> Dict[str, Any]:
         """Get current queue status"""
-        with self.lock:
-            queue_jobs = [self.jobs[job_id] for job_id in self.queue_order if job_id in self.jobs]
-            active_job_info = self.jobs.get(self.active_job) if self.active_job else None
-            
-            total_estimated_wait = 0
-            for i, job in enumerate(queue_jobs):
-                if i == 0 and active_job_info:
-                    # First job waits for current job to finish
-                    remaining_time = self._estimate_remaining_time(active_job_info)
-                    total_estimated_wait += remaining_time
-                else:
-                    total_estimated_wait += job.estimated_duration or 150.0
-            
-            return {
-                "queue_length": len(queue_jobs),
-                "active_job": asdict(active_job_info) if active_job_info else None,
-                "estimated_wait_time": total_estimated_wait,
-                "queue_jobs": [asdict(job) for job in queue_jobs[:5]],  # Show first 5
-                "avg_processing_times": self.avg_processing_times.copy()
-            }
+        jobs, queue_order, active_job, _ = self._snapshot
+        queue_jobs = [jobs[job_id] for job_id in queue_order if job_id in jobs]
+        active_job_info = jobs.get(active_job) if active_job else None
+        now = datetime.now()
+        
+        total_estimated_wait = 0
+        for i, job in enumerate(queue_jobs):
+            if i == 0 and active_job_info:
+                # First job waits for current job to finish
+                remaining_time = self._estimate_remaining_time(active_job_info, now)
+                total_estimated_wait += remaining_time
+            else:
+                total_estimated_wait += job.estimated_duration or 150.0
+        
+        return {
+            "queue_length": len(queue_jobs),
+            "active_job": active_job_info.to_view() if active_job_info else None,
+            "estimated_wait_time": total_estimated_wait,
+            "queue_jobs": [job.to_view() for job in queue_jobs[:5]],  # Show first 5
+            "avg_processing_times": self.avg_processing_times.copy()
+        }
     
     def get_job_position(self, job_id: str) -> Optional[int]:
         """Get position of job in queue (1-indexed)"""
-        with self.lock:
-            try:
-                return self.queue_order.index(job_id) + 1
-            except ValueError:
-                return None
+        positions = self._snapshot[3]
+        return positions.get(job_id)
     
     def get_job_info(self, job_id: str) -> Optional[JobInfo]:
         """Get information about a specific job"""
-        with self.lock:
-            return self.jobs.get(job_id)
+        jobs = self._snapshot[0]
+        return jobs.get(job_id)
     
-    def _estimate_remaining_time(self, job: JobInfo) -> float:
-        """Estimate remaining time for a job in progress"""
+    def _estimate_remaining_time(self, job: JobInfo, now: Optional[datetime] = None) -> float:
+        """Estimate remaining time for a job in progress (now defaults to the current time)"""
         if not job.started_at or job.progress <= 0:
             return job.estimated_duration or 150.0
         
-        elapsed = (datetime.now() - job.started_at).total_seconds()
+        elapsed = ((now or datetime.now()) - job.started_at).total_seconds()
         if job.progress >= 1.0:
             return 0.0
         
@@ -187,10 +227,11 @@ class QueueManager:
         
         with self.lock:
             # Clean up job history
-            self.job_history = [
-                job for job in self.job_history 
-                if job.completed_at and job.completed_at > cutoff_time
-            ]
+            self.job_history = deque(
+                (job for job in self.job_history 
+                 if job.completed_at and job.completed_at > cutoff_time),
+                maxlen=self.job_history.maxlen
+            )
             
             # Clean up any stale jobs in main dict
             stale_jobs = [
@@ -200,8 +241,12 @@ class QueueManager:
             
             for job_id in stale_jobs:
                 del self.jobs[job_id]
-                if job_id in self.queue_order:
-                    self.queue_order.remove(job_id)
+                self.queue_order.pop(job_id, None)
+            
+            # History is not part of the snapshot; republishing without a removal
+            # would only invalidate version-keyed renders
+            if stale_jobs:
+                self._publish()
 
 # Global queue manager instance
 queue_manager = QueueManager()
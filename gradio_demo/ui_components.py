@@ -4,6 +4,7 @@ Provides queue status, progress tracking, and log display components
 """
 
 import gradio as gr
+import re
 import json
 import time
 from typing import Dict, Any, List, Optional
@@ -11,6 +12,19 @@ from datetime import datetime, timedelta
 from queue_manager import queue_manager
 from progress_capture import progress_tracker
 
+# Last rendered output per panel as (state key, output). The refresh timer fires
+# every 2 seconds per open tab, and most ticks see unchanged state
+_render_cache: Dict[str, tuple] = {}
+
+def _render_cached(panel: str, key, render):
+    """Return the cached output for panel if it was rendered from an equal key"""
+    cached = _render_cache.get(panel)
+    if cached is not None and key is not None and cached[0] == key:
+        return cached[1]
+    output = render()
+    _render_cache[panel] = (key, output)
+    return output
+
 def format_duration(seconds: float) -> str:
     """Format duration in seconds to human readable format"""
     if seconds < 60:
@@ -24,74 +38,52 @@ def format_duration(seconds: float) -> str:
         minutes = int((seconds % 3600) // 60)
         return f"{hours}h {minutes}m"
 
-def create_queue_status_html(queue_status: Dict[str, Any]) -> str:
-    """Create HTML for queue status display"""
-    if queue_status["queue_length"] == 0 and not queue_status["active_job"]:
-        return """
+# Panel HTML, hoisted so each refresh only formats the variable fragments and
+# joins them once
+_QUEUE_IDLE_HTML = """
         <div style="padding: 15px; background: #f0f9ff; border: 1px solid #0ea5e9; border-radius: 8px;">
             <h3 style="margin: 0 0 10px 0; color: #0369a1;">🎯 Queue Status</h3>
             <p style="margin: 0; color: #0369a1; font-weight: bold;">✅ No jobs in queue - Ready for new requests!</p>
         </div>
         """
-    
-    html = """
+
+_QUEUE_HEADER_HTML = """
     <div style="padding: 15px; background: #fef3c7; border: 1px solid #f59e0b; border-radius: 8px;">
         <h3 style="margin: 0 0 15px 0; color: #92400e;">📊 Queue Status</h3>
     """
-    
-    # Active job info
-    if queue_status["active_job"]:
-        active = queue_status["active_job"]
-        progress_pct = int(active["progress"] * 100)
-        
-        html += f"""
+
+_QUEUE_ACTIVE_TEMPLATE = """
         <div style="margin-bottom: 15px; padding: 10px; background: #dcfce7; border-radius: 6px;">
             <h4 style="margin: 0 0 8px 0; color: #166534;">🔄 Currently Processing</h4>
-            <p style="margin: 0 0 5px 0;"><strong>Job ID:</strong> {active["job_id"]}</p>
-            <p style="margin: 0 0 5px 0;"><strong>Type:</strong> {active["job_type"].title()}</p>
-            <p style="margin: 0 0 10px 0;"><strong>Status:</strong> {active["current_step"]}</p>
+            <p style="margin: 0 0 5px 0;"><strong>Job ID:</strong> {job_id}</p>
+            <p style="margin: 0 0 5px 0;"><strong>Type:</strong> {job_type}</p>
+            <p style="margin: 0 0 10px 0;"><strong>Status:</strong> {current_step}</p>
             <div style="background: #e5e7eb; border-radius: 10px; height: 20px; overflow: hidden;">
                 <div style="background: #10b981; height: 100%; width: {progress_pct}%; transition: width 0.3s;"></div>
             </div>
             <p style="margin: 5px 0 0 0; font-size: 12px; color: #374151;">{progress_pct}% Complete</p>
         </div>
         """
-    
-    # Queue info
-    if queue_status["queue_length"] > 0:
-        wait_time = format_duration(queue_status["estimated_wait_time"])
-        html += f"""
+
+_QUEUE_WAIT_TEMPLATE = """
         <div style="margin-bottom: 10px;">
-            <p style="margin: 0 0 5px 0;"><strong>📋 Jobs in Queue:</strong> {queue_status["queue_length"]}</p>
+            <p style="margin: 0 0 5px 0;"><strong>📋 Jobs in Queue:</strong> {queue_length}</p>
             <p style="margin: 0 0 10px 0;"><strong>⏱️ Estimated Wait Time:</strong> {wait_time}</p>
         </div>
         """
-        
-        # Show first few jobs in queue
-        if queue_status["queue_jobs"]:
-            html += "<h4 style='margin: 10px 0 5px 0; color: #92400e;'>Next Jobs:</h4><ul style='margin: 0; padding-left: 20px;'>"
-            for i, job in enumerate(queue_status["queue_jobs"][:3]):
-                created_time = datetime.fromisoformat(job["created_at"].replace('Z', '+00:00')).strftime('%H:%M:%S')
-                html += f"<li><strong>{job['job_id']}</strong> ({job['job_type']}) - Added at {created_time}</li>"
-            html += "</ul>"
-    
-    html += "</div>"
-    return html
 
-def create_progress_display_html(progress_info: Dict[str, Any]) -> str:
-    """Create HTML for detailed progress display"""
-    if not progress_info.get("active", False):
-        return """
+_QUEUE_JOBS_HEADER_HTML = "<h4 style='margin: 10px 0 5px 0; color: #92400e;'>Next Jobs:</h4><ul style='margin: 0; padding-left: 20px;'>"
+
+_QUEUE_JOB_TEMPLATE = "<li><strong>{job_id}</strong> ({job_type}) - Added at {created_at}</li>"
+
+_PROGRESS_IDLE_HTML = """
         <div style="padding: 15px; background: #f9fafb; border: 1px solid #d1d5db; border-radius: 8px;">
             <h3 style="margin: 0; color: #6b7280;">📈 Progress Monitor</h3>
             <p style="margin: 10px 0 0 0; color: #6b7280;">No active job</p>
         </div>
         """
-    
-    progress = progress_info["progress"]
-    percentage = progress["percentage"]
-    
-    html = f"""
+
+_PROGRESS_HEADER_TEMPLATE = """
     <div style="padding: 15px; background: #f0f9ff; border: 1px solid #3b82f6; border-radius: 8px;">
         <h3 style="margin: 0 0 15px 0; color: #1d4ed8;">📈 Live Progress Monitor</h3>
         
@@ -105,31 +97,97 @@ def create_progress_display_html(progress_info: Dict[str, Any]) -> str:
             </div>
         </div>
     """
-    
-    if progress["current_step"] and progress["total_steps"]:
-        html += f"""
+
+_PROGRESS_STEP_TEMPLATE = """
         <div style="margin-bottom: 15px;">
-            <p style="margin: 0 0 5px 0;"><strong>Step:</strong> {progress["current_step"]} / {progress["total_steps"]}</p>
+            <p style="margin: 0 0 5px 0;"><strong>Step:</strong> {current_step} / {total_steps}</p>
         </div>
         """
-    
-    if progress["description"]:
-        html += f"""
+
+_PROGRESS_DESCRIPTION_TEMPLATE = """
         <div style="margin-bottom: 15px; padding: 10px; background: #dbeafe; border-radius: 6px;">
-            <p style="margin: 0; font-family: monospace; font-size: 12px;">{progress["description"]}</p>
+            <p style="margin: 0; font-family: monospace; font-size: 12px;">{description}</p>
         </div>
         """
-    
-    if progress["eta"]:
-        html += f"""
+
+_PROGRESS_ETA_TEMPLATE = """
         <div style="display: flex; justify-content: space-between; font-size: 12px; color: #6b7280;">
-            <span>ETA: {progress["eta"]}</span>
-            <span>Elapsed: {format_duration(progress["elapsed_time"])}</span>
+            <span>ETA: {eta}</span>
+            <span>Elapsed: {elapsed}</span>
         </div>
         """
+
+_PANEL_FOOTER_HTML = "</div>"
+
+def create_queue_status_html(queue_status: Dict[str, Any]) -> str:
+    """Create HTML for queue status display"""
+    if queue_status["queue_length"] == 0 and not queue_status["active_job"]:
+        return _QUEUE_IDLE_HTML
+    
+    parts = [_QUEUE_HEADER_HTML]
     
-    html += "</div>"
-    return html
+    # Active job info
+    if queue_status["active_job"]:
+        active = queue_status["active_job"]
+        parts.append(_QUEUE_ACTIVE_TEMPLATE.format(
+            job_id=active["job_id"],
+            job_type=active["job_type"].title(),
+            current_step=active["current_step"],
+            progress_pct=int(active["progress"] * 100)
+        ))
+    
+    # Queue info
+    if queue_status["queue_length"] > 0:
+        parts.append(_QUEUE_WAIT_TEMPLATE.format(
+            queue_length=queue_status["queue_length"],
+            wait_time=format_duration(queue_status["estimated_wait_time"])
+        ))
+        
+        # Show first few jobs in queue
+        if queue_status["queue_jobs"]:
+            parts.append(_QUEUE_JOBS_HEADER_HTML)
+            for job in queue_status["queue_jobs"][:3]:
+                parts.append(_QUEUE_JOB_TEMPLATE.format(**job))
+            parts.append("</ul>")
+    
+    parts.append(_PANEL_FOOTER_HTML)
+    return "".join(parts)
+
+def create_progress_display_html(progress_info: Dict[str, Any]) -> str:
+    """Create HTML for detailed progress display"""
+    if not progress_info.get("active", False):
+        return _PROGRESS_IDLE_HTML
+    
+    progress = progress_info["progress"]
+    parts = [_PROGRESS_HEADER_TEMPLATE.format(percentage=progress["percentage"])]
+    
+    if progress["current_step"] and progress["total_steps"]:
+        parts.append(_PROGRESS_STEP_TEMPLATE.format(
+            current_step=progress["current_step"],
+            total_steps=progress["total_steps"]
+        ))
+    
+    if progress["description"]:
+        parts.append(_PROGRESS_DESCRIPTION_TEMPLATE.format(description=progress["description"]))
+    
+    if progress["eta"]:
+        parts.append(_PROGRESS_ETA_TEMPLATE.format(
+            eta=progress["eta"],
+            elapsed=format_duration(progress["elapsed_time"])
+        ))
+    
+    parts.append(_PANEL_FOOTER_HTML)
+    return "".join(parts)
+
+# Log line markers, checked in one regex pass per line; when a line holds
+# several, the earliest entry in _LOG_STYLES wins
+_LOG_MARKER_RE = re.compile(r'ERROR|WARNING|INFO|%')
+_LOG_STYLES = (
+    ("ERROR", "color: #dc2626;"),
+    ("WARNING", "color: #d97706;"),
+    ("INFO", "color: #059669;"),
+    ("%", "color: #2563eb; font-weight: bold;"),  # Progress lines
+)
 
 def create_log_display(log_lines: List[str]) -> str:
     """Create formatted log display"""
@@ -140,14 +198,10 @@ def create_log_display(log_lines: List[str]) -> str:
     formatted_logs = []
     for line in log_lines[-20:]:  # Show last 20 lines
         # Add basic color coding
-        if "[ERROR]" in line or "ERROR" in line:
-            formatted_logs.append(f'<span style="color: #dc2626;">{line}</span>')
-        elif "[WARNING]" in line or "WARNING" in line:
-            formatted_logs.append(f'<span style="color: #d97706;">{line}</span>')
-        elif "[INFO]" in line or "INFO" in line:
-            formatted_logs.append(f'<span style="color: #059669;">{line}</span>')
-        elif "%" in line:  # Progress lines
-            formatted_logs.append(f'<span style="color: #2563eb; font-weight: bold;">{line}</span>')
+        markers = _LOG_MARKER_RE.findall(line)
+        if markers:
+            style = next(style for marker, style in _LOG_STYLES if marker in markers)
+            formatted_logs.append(f'<span style="{style}">{line}</span>')
         else:
             formatted_logs.append(line)
     
@@ -156,8 +210,16 @@ def create_log_display(log_lines: List[str]) -> str:
 def get_queue_status() -> str:
     """Get current queue status as HTML"""
     try:
+        cached = _render_cache.get("queue")
+        if cached is not None and cached[0] == queue_manager.version:
+            return cached[1]
+        
+        version = queue_manager.version
         status = queue_manager.get_queue_status()
-        return create_queue_status_html(status)
+        html = create_queue_status_html(status)
+        # The wait estimate moves with the clock, so only cache when nothing is waiting
+        _render_cache["queue"] = (version if status["queue_length"] == 0 else None, html)
+        return html
     except Exception as e:
         return f"""
         <div style="padding: 15px; background: #fef2f2; border: 1px solid #ef4444; border-radius: 8px;">
@@ -169,18 +231,18 @@ def get_queue_status() -> str:
 def get_progress_status(job_id: str = None) -> str:
     """Get current progress status as HTML"""
     try:
-        if job_id:
-            progress_info = progress_tracker.get_job_progress_info(job_id)
-        else:
-            # Get active job progress
-            queue_status = queue_manager.get_queue_status()
-            if queue_status["active_job"]:
-                job_id = queue_status["active_job"]["job_id"]
+        # Get active job progress unless a job was given
+        job_id = job_id or queue_manager.active_job
+        
+        def render():
+            if job_id:
                 progress_info = progress_tracker.get_job_progress_info(job_id)
             else:
                 progress_info = {"active": False}
+            return create_progress_display_html(progress_info)
         
-        return create_progress_display_html(progress_info)
+        key = (job_id, progress_tracker.active_job_id, progress_tracker.tqdm_capture.get_current_progress())
+        return _render_cached("progress", key, render)
     except Exception as e:
         return f"""
         <div style="padding: 15px; background: #fef2f2; border: 1px solid #ef4444; border-radius: 8px;">
@@ -192,20 +254,18 @@ def get_progress_status(job_id: str = None) -> str:
 def get_live_logs(job_id: str = None) -> str:
     """Get live logs for display"""
     try:
-        if job_id:
-            progress_info = progress_tracker.get_job_progress_info(job_id)
-            if progress_info.get("active", False):
-                return create_log_display(progress_info["recent_logs"])
+        active_job = queue_manager.active_job
         
-        # Get logs from active job
-        queue_status = queue_manager.get_queue_status()
-        if queue_status["active_job"]:
-            job_id = queue_status["active_job"]["job_id"]
-            progress_info = progress_tracker.get_job_progress_info(job_id)
-            if progress_info.get("active", False):
-                return create_log_display(progress_info["recent_logs"])
+        def render():
+            for candidate in (job_id, active_job):
+                if candidate:
+                    progress_info = progress_tracker.get_job_progress_info(candidate)
+                    if progress_info.get("active", False):
+                        return create_log_display(progress_info["recent_logs"])
+            return "No active job logs"
         
-        return "No active job logs"
+        key = (job_id, active_job, progress_tracker.active_job_id, progress_tracker.log_capture.snapshot())
+        return _render_cached("logs", key, render)
     except Exception as e:
         return f"Error retrieving logs: {str(e)}"
 
@@ -237,19 +297,30 @@ def create_enhanced_status_components():
         show_copy_button=True
     )
     
+    # Outputs last sent to this browser session, so unchanged panels are not resent
+    last_sent = gr.State(None)
+    
     # Auto-refresh components
-    def update_status_components():
-        return (
+    def update_status_components(previous):
+        current = (
             get_queue_status(),
             get_progress_status(),
             get_live_logs()
         )
+        if previous is None:
+            return (*current, current)
+        updates = tuple(
+            gr.skip() if new == old else new
+            for new, old in zip(current, previous)
+        )
+        return (*updates, current)
     
     # Create refresh timer (updates every 2 seconds)
     refresh_timer = gr.Timer(2.0)
     refresh_timer.tick(
         fn=update_status_components,
-        outputs=[queue_status_html, progress_html, logs_textbox]
+        inputs=[last_sent],
+        outputs=[queue_status_html, progress_html, logs_textbox, last_sent]
     )
     
     return queue_status_html, progress_html, logs_textbox, refresh_timer
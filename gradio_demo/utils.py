@@ -1,10 +1,11 @@
 import os
 import logging
+import functools
+import importlib.util
 import traceback
 import numpy as np
 import torch
 from typing import List, Dict, Any
-from einops import rearrange
 import librosa
 import pyloudnorm as pyln
 import subprocess
@@ -72,6 +73,11 @@ def get_example_data() -> Dict[str, List]:
         "multi": multi_examples
     }
 
+@functools.lru_cache(maxsize=8)
+def _get_meter(sr: int) -> pyln.Meter:
+    """Shared loudness meter per sample rate (its K-weighting filters are fixed)"""
+    return pyln.Meter(sr)
+
 def loudness_norm(audio_array: np.ndarray, sr: int = 16000, lufs: float = -23) -> np.ndarray:
     """
     Normalize audio loudness
@@ -82,10 +88,14 @@ def loudness_norm(audio_array: np.ndarray, sr: int = 16000, lufs: float = -23) -
         lufs: Target loudness in LUFS
         
     Returns:
-        Normalized audio array
+        Normalized audio array (the fallback path scales audio_array in place)
     """
+    # Silent (or empty) audio has no loudness to measure; skip the filter pass
+    if audio_array.size == 0 or max(float(audio_array.max()), -float(audio_array.min())) < 1e-9:
+        return audio_array
+    
     try:
-        meter = pyln.Meter(sr)
+        meter = _get_meter(sr)
         loudness = meter.integrated_loudness(audio_array)
         if abs(loudness) > 100:
             return audio_array
@@ -93,8 +103,10 @@ def loudness_norm(audio_array: np.ndarray, sr: int = 16000, lufs: float = -23) -
         return normalized_audio
     except Exception as e:
         logging.warning(f"Loudness normalization failed: {e}")
-        # Fallback normalization
-        return audio_array / (np.max(np.abs(audio_array)) + 1e-8) * 0.8
+        # Fallback normalization, in place and without an abs() temporary
+        peak = max(float(audio_array.max()), -float(audio_array.min()))
+        audio_array *= audio_array.dtype.type(0.8 / (peak + 1e-8))
+        return audio_array
 
 def audio_prepare_multi(left_path: str, right_path: str, audio_type: str, sample_rate: int = 16000) -> tuple:
     """
@@ -120,19 +132,18 @@ def audio_prepare_multi(left_path: str, right_path: str, audio_type: str, sample
         human_speech_array1 = audio_prepare_single(left_path)
         human_speech_array2 = np.zeros(human_speech_array1.shape[0])
 
-    if audio_type == 'para':
-        new_human_speech1 = human_speech_array1
-        new_human_speech2 = human_speech_array2
-    elif audio_type == 'add':
-        new_human_speech1 = np.concatenate([
-            human_speech_array1[:human_speech_array1.shape[0]], 
-            np.zeros(human_speech_array2.shape[0])
-        ]) 
-        new_human_speech2 = np.concatenate([
-            np.zeros(human_speech_array1.shape[0]), 
-            human_speech_array2[:human_speech_array2.shape[0]]
-        ])
+    if audio_type == 'add':
+        # Speaker 2 follows speaker 1: fill one (3, n1 + n2) buffer holding both
+        # padded tracks and their sum, and return row views into it
+        n1, n2 = human_speech_array1.shape[0], human_speech_array2.shape[0]
+        out = np.zeros((3, n1 + n2), dtype=np.result_type(human_speech_array1, human_speech_array2))
+        out[0, :n1] = human_speech_array1
+        out[1, n1:] = human_speech_array2
+        np.add(out[0], out[1], out=out[2])
+        return out[0], out[1], out[2]
     
+    new_human_speech1 = human_speech_array1
+    new_human_speech2 = human_speech_array2
     sum_human_speechs = new_human_speech1 + new_human_speech2
     return new_human_speech1, new_human_speech2, sum_human_speechs
 
@@ -147,25 +158,27 @@ def extract_audio_from_video(filename: str, sample_rate: int) -> np.ndarray:
     Returns:
         Audio array
     """
-    raw_audio_path = filename.split('/')[-1].split('.')[0] + '.wav'
+    # Let ffmpeg decode, downmix and resample, and stream raw float32 PCM back
+    # over stdout instead of round-tripping through a temporary WAV file
     ffmpeg_command = [
         "ffmpeg",
-        "-y",
         "-i",
         str(filename),
         "-vn",
+        "-f",
+        "f32le",
         "-acodec",
-        "pcm_s16le",
+        "pcm_f32le",
         "-ar",
-        "16000",
+        str(sample_rate),
         "-ac",
-        "2",
-        str(raw_audio_path),
+        "1",
+        "pipe:1",
     ]
-    subprocess.run(ffmpeg_command, check=True)
-    human_speech_array, sr = librosa.load(raw_audio_path, sr=sample_rate)
-    human_speech_array = loudness_norm(human_speech_array, sr)
-    os.remove(raw_audio_path)
+    result = subprocess.run(ffmpeg_command, stdout=subprocess.PIPE, check=True)
+    # frombuffer over bytes is read-only; loudness_norm may scale in place
+    human_speech_array = np.frombuffer(result.stdout, dtype=np.float32).copy()
+    human_speech_array = loudness_norm(human_speech_array, sample_rate)
     return human_speech_array
 
 def audio_prepare_single(audio_path: str, sample_rate: int = 16000) -> np.ndarray:
@@ -188,6 +201,24 @@ def audio_prepare_single(audio_path: str, sample_rate: int = 16000) -> np.ndarra
         human_speech_array = loudness_norm(human_speech_array, sr)
         return human_speech_array
 
+def _to_device(tensor: torch.Tensor, device, dtype: torch.dtype = None) -> torch.Tensor:
+    """Move a CPU tensor to device (cast to dtype), staging CUDA copies through pinned memory"""
+    dtype = dtype or tensor.dtype
+    if torch.device(device).type == 'cuda':
+        # The staging buffer comes from PyTorch's caching pinned-memory allocator, so
+        # repeated calls reuse page-locked blocks, and the copy into it does the cast.
+        # The upload is ordered before the encoder on the same stream, so no explicit
+        # synchronization is needed
+        staging = torch.empty(tensor.shape, dtype=dtype, pin_memory=True)
+        staging.copy_(tensor)
+        return staging.to(device=device, non_blocking=True)
+    return tensor.to(device=device, dtype=dtype)
+
+def _encode_audio(audio_encoder, audio_feature: torch.Tensor, video_length: float):
+    """Run the audio encoder without autograd, in bf16 on CUDA"""
+    with torch.inference_mode(), torch.autocast('cuda', dtype=torch.bfloat16, enabled=audio_feature.is_cuda):
+        return audio_encoder(audio_feature, seq_len=int(video_length), output_hidden_states=True)
+
 def get_embedding(speech_array: np.ndarray, wav2vec_feature_extractor, audio_encoder, sr: int = 16000, device: str = 'cpu') -> torch.Tensor:
     """
     Get audio embedding from speech array
@@ -205,27 +236,74 @@ def get_embedding(speech_array: np.ndarray, wav2vec_feature_extractor, audio_enc
     audio_duration = len(speech_array) / sr
     video_length = audio_duration * 25  # Assume the video fps is 25
 
-    # wav2vec_feature_extractor
-    audio_feature = np.squeeze(
-        wav2vec_feature_extractor(speech_array, sampling_rate=sr).input_values
-    )
-    audio_feature = torch.from_numpy(audio_feature).float().to(device=device)
-    audio_feature = audio_feature.unsqueeze(0)
+    # wav2vec_feature_extractor, already batched as (1, L)
+    audio_feature = wav2vec_feature_extractor(
+        speech_array, sampling_rate=sr, return_tensors="pt"
+    ).input_values
+    # Upload in the encoder's dtype (bf16 in the demo) to halve the transfer
+    encoder_dtype = next(audio_encoder.parameters()).dtype
+    audio_feature = _to_device(audio_feature, device, encoder_dtype)
 
     # audio encoder
-    with torch.no_grad():
-        embeddings = audio_encoder(audio_feature, seq_len=int(video_length), output_hidden_states=True)
+    embeddings = _encode_audio(audio_encoder, audio_feature, video_length)
 
     if len(embeddings) == 0:
         print("Fail to extract audio embedding")
         return None
 
-    audio_emb = torch.stack(embeddings.hidden_states[1:], dim=1).squeeze(0)
-    audio_emb = rearrange(audio_emb, "b s d -> s b d")
+    # Stacking the (1, s, d) layers on dim 2 lays them out directly as (s, layers, d)
+    audio_emb = torch.stack(embeddings.hidden_states[1:], dim=2)[0]
 
     audio_emb = audio_emb.cpu().detach()
     return audio_emb
 
+def get_embedding_batched(speech_list: List[np.ndarray], wav2vec_feature_extractor, audio_encoder, sr: int = 16000, device: str = 'cpu') -> List[torch.Tensor]:
+    """
+    Get audio embeddings for several speech arrays with a single encoder pass
+    
+    The encoder resamples its features to the video length of the whole input, so
+    arrays are only batched when they have the same length; otherwise each one is
+    encoded separately with get_embedding.
+    
+    Args:
+        speech_list: Input audio arrays
+        wav2vec_feature_extractor: Wav2Vec feature extractor
+        audio_encoder: Audio encoder model
+        sr: Sample rate
+        device: Device to run on
+        
+    Returns:
+        List of audio embedding tensors, one per input array
+    """
+    if len({len(speech_array) for speech_array in speech_list}) != 1:
+        return [
+            get_embedding(speech_array, wav2vec_feature_extractor, audio_encoder, sr=sr, device=device)
+            for speech_array in speech_list
+        ]
+    
+    audio_duration = len(speech_list[0]) / sr
+    video_length = audio_duration * 25  # Assume the video fps is 25
+
+    # wav2vec_feature_extractor, batched as (B, L)
+    audio_feature = wav2vec_feature_extractor(
+        speech_list, sampling_rate=sr, return_tensors="pt"
+    ).input_values
+    encoder_dtype = next(audio_encoder.parameters()).dtype
+    audio_feature = _to_device(audio_feature, device, encoder_dtype)
+
+    # audio encoder
+    embeddings = _encode_audio(audio_encoder, audio_feature, video_length)
+
+    if len(embeddings) == 0:
+        print("Fail to extract audio embedding")
+        return [None] * len(speech_list)
+
+    # (b, s, layers, d) directly, without a permuted copy
+    audio_emb = torch.stack(embeddings.hidden_states[1:], dim=2)
+
+    audio_emb = audio_emb.cpu().detach()
+    return list(audio_emb.unbind(0))
+
 def check_dependencies() -> Dict[str, bool]:
     """
     Check if all required dependencies are available
@@ -233,58 +311,13 @@ def check_dependencies() -> Dict[str, bool]:
     Returns:
         Dictionary of dependency status
     """
+    # find_spec only locates each package; importing them here would initialise
+    # CUDA, load native libraries, etc. just to answer a yes/no question
     dependencies = {
-        'torch': False,
-        'gradio': False,
-        'librosa': False,
-        'PIL': False,
-        'transformers': False,
-        'soundfile': False,
-        'pyloudnorm': False,
-        'ffmpeg': False
+        package: importlib.util.find_spec(package) is not None
+        for package in ('torch', 'gradio', 'librosa', 'PIL', 'transformers', 'soundfile', 'pyloudnorm')
     }
-    
-    try:
-        import torch
-        dependencies['torch'] = True
-    except ImportError:
-        pass
-    
-    try:
-        import gradio
-        dependencies['gradio'] = True
-    except ImportError:
-        pass
-    
-    try:
-        import librosa
-        dependencies['librosa'] = True
-    except ImportError:
-        pass
-    
-    try:
-        from PIL import Image
-        dependencies['PIL'] = True
-    except ImportError:
-        pass
-    
-    try:
-        import transformers
-        dependencies['transformers'] = True
-    except ImportError:
-        pass
-    
-    try:
-        import soundfile
-        dependencies['soundfile'] = True
-    except ImportError:
-        pass
-    
-    try:
-        import pyloudnorm
-        dependencies['pyloudnorm'] = True
-    except ImportError:
-        pass
+    dependencies['ffmpeg'] = False
     
     try:
         result = subprocess.run(['ffmpeg', '-version'], capture_output=True, text=True)
@@ -294,6 +327,14 @@ def check_dependencies() -> Dict[str, bool]:
     
     return dependencies
 
+def _list_dir(directory: str):
+    """Return the set of entry names in a directory, or None if it cannot be read"""
+    try:
+        with os.scandir(directory) as entries:
+            return {entry.name for entry in entries}
+    except OSError:
+        return None
+
 def validate_model_paths(ckpt_dir: str, wav2vec_dir: str) -> Dict[str, bool]:
     """
     Validate that required model paths exist
@@ -305,33 +346,31 @@ def validate_model_paths(ckpt_dir: str, wav2vec_dir: str) -> Dict[str, bool]:
     Returns:
         Dictionary of path validation status
     """
+    # One directory listing each instead of a stat per file (slow on network filesystems)
+    ckpt_files = _list_dir(ckpt_dir)
+    wav2vec_files = _list_dir(wav2vec_dir)
+    
     validation = {
-        'ckpt_dir_exists': os.path.exists(ckpt_dir),
-        'wav2vec_dir_exists': os.path.exists(wav2vec_dir),
+        'ckpt_dir_exists': ckpt_files is not None,
+        'wav2vec_dir_exists': wav2vec_files is not None,
         'diffusion_model_exists': False,
         'vae_model_exists': False,
         'wav2vec_model_exists': False
     }
     
-    if validation['ckpt_dir_exists']:
+    if ckpt_files is not None:
         # Check for key model files
-        diffusion_files = [
+        diffusion_files = {
             'diffusion_pytorch_model.safetensors.index.json',
             'multitalk.safetensors'
-        ]
-        validation['diffusion_model_exists'] = all(
-            os.path.exists(os.path.join(ckpt_dir, f)) for f in diffusion_files
-        )
+        }
+        validation['diffusion_model_exists'] = diffusion_files <= ckpt_files
         
-        vae_files = ['vae_pytorch_model.bin']
-        validation['vae_model_exists'] = any(
-            os.path.exists(os.path.join(ckpt_dir, f)) for f in vae_files
-        )
+        vae_files = {'vae_pytorch_model.bin'}
+        validation['vae_model_exists'] = not vae_files.isdisjoint(ckpt_files)
     
-    if validation['wav2vec_dir_exists']:
-        wav2vec_files = ['pytorch_model.bin', 'config.json']
-        validation['wav2vec_model_exists'] = all(
-            os.path.exists(os.path.join(wav2vec_dir, f)) for f in wav2vec_files
-        )
+    if wav2vec_files is not None:
+        wav2vec_model_files = {'pytorch_model.bin', 'config.json'}
+        validation['wav2vec_model_exists'] = wav2vec_model_files <= wav2vec_files
     
     return validation
@@ -1,5 +1,6 @@
 # Copyright 2024-2025 The Alibaba Wan Team Authors. All rights reserved.
 import logging
+import math
 
 import torch
 import torch.cuda.amp as amp
@@ -589,6 +590,31 @@ class WanVAE_(nn.Module):
         self._enc_feat_map = [None] * self._enc_conv_num
 
 
+def _tile_starts(size, tile, step):
+    starts = list(range(0, max(size - tile, 0) + 1, step))
+    if starts[-1] + tile < size:
+        starts.append(size - tile)
+    return starts
+
+
+def _blend_window(h, w, overlap, device):
+    """
+    Weights in (0, 1] that ramp up over `overlap` pixels at each tile edge.
+    """
+
+    def ramp(n):
+        win = torch.ones(n, device=device)
+        k = min(overlap, n // 2)
+        if k > 0:
+            edge = 0.5 - 0.5 * torch.cos(
+                math.pi * (torch.arange(k, device=device) + 0.5) / k)
+            win[:k] = edge
+            win[-k:] = edge.flip(0)
+        return win
+
+    return ramp(h)[:, None] * ramp(w)[None, :]
+
+
 def _video_vae(pretrained_path=None, z_dim=None, device='cpu', **kwargs):
     """
     Autoencoder3d adapted from Stable Diffusion 1.x, 2.x and XL.
@@ -625,6 +651,10 @@ class WanVAE:
                  device="cuda"):
         self.dtype = dtype
         self.device = device
+        self.spatial_stride = 8
+        self.tile_size = None
+        self.tile_overlap = 0
+        self.decode_dtype = dtype
 
         mean = [
             -0.7571, -0.7089, -0.9113, 0.1075, -0.1745, 0.9653, -0.1517, 1.5508,
@@ -655,9 +685,51 @@ class WanVAE:
             ]
 
     def decode(self, zs):
-        with amp.autocast(dtype=self.dtype):
+        decode_fn = self._tiled_decode if self.tile_size else self._decode
+        with amp.autocast(dtype=self.decode_dtype):
             return [
-                self.model.decode(u.unsqueeze(0),
-                                  self.scale).float().clamp_(-1, 1).squeeze(0)
+                decode_fn(u.unsqueeze(0)).float().clamp_(-1, 1).squeeze(0)
                 for u in zs
             ]
+
+    def enable_tiling(self, tile_size=256, tile_overlap=32, dtype=None):
+        """
+        Decode in overlapping spatial tiles of tile_size pixels to bound peak memory.
+        If dtype is given, only the decode path (conv2 + decoder) is cast to it;
+        encoding keeps the original weights and dtype.
+        """
+        self.tile_size = tile_size
+        self.tile_overlap = tile_overlap
+        if dtype is not None:
+            self.model.conv2.to(dtype)
+            self.model.decoder.to(dtype)
+            self.decode_dtype = dtype
+
+    def _decode(self, z):
+        return self.model.decode(z, self.scale)
+
+    def _tiled_decode(self, z):
+        """
+        z: A latent with shape [1, C, T, h, w], decoded tile by tile and blended with a cosine window.
+        """
+        tile = self.tile_size // self.spatial_stride
+        overlap = self.tile_overlap // self.spatial_stride
+        h, w = z.shape[-2:]
+        if h <= tile and w <= tile:
+            return self._decode(z)
+
+        out, weight = None, None
+        for y in _tile_starts(h, tile, tile - overlap):
+            for x in _tile_starts(w, tile, tile - overlap):
+                tile_out = self._decode(z[..., y:y + tile, x:x + tile]).float()
+                th, tw = tile_out.shape[-2:]
+                if out is None:
+                    out = tile_out.new_zeros(
+                        *tile_out.shape[:3], h * self.spatial_stride,
+                        w * self.spatial_stride)
+                    weight = tile_out.new_zeros(out.shape[-2:])
+                mask = _blend_window(th, tw, self.tile_overlap, tile_out.device)
+                ys, xs = y * self.spatial_stride, x * self.spatial_stride
+                out[..., ys:ys + th, xs:xs + tw] += tile_out * mask
+                weight[ys:ys + th, xs:xs + tw] += mask
+        return out / weight
@@ -223,7 +223,8 @@ class MultiTalkPipeline:
                  offload_model=True,
                  max_frames_num=1000,
                  face_scale=0.05,
-                 progress=True):
+                 progress=True,
+                 deterministic=True):
         r"""
         Generates video frames from input image and text prompt using diffusion process.
 
@@ -241,6 +242,8 @@ class MultiTalkPipeline:
                 Random seed for noise generation. If -1, use random seed
             offload_model (`bool`, *optional*, defaults to True):
                 If True, offloads models to CPU during generation to save VRAM
+            deterministic (`bool`, *optional*, defaults to True):
+                If True, forces deterministic cuDNN kernels for reproducible results at some speed cost
         """
         input_prompt = input_data['prompt']
         cond_file_path = input_data['cond_image']
@@ -279,9 +282,13 @@ class MultiTalkPipeline:
         audio_embedding_paths = [audio_embedding_path_1, audio_embedding_path_2]
         for human_idx in range(HUMAN_NUMBER):   
             audio_embedding_path = audio_embedding_paths[human_idx]
-            if not os.path.exists(audio_embedding_path):
-                continue
-            full_audio_emb = torch.load(audio_embedding_path)
+            if isinstance(audio_embedding_path, torch.Tensor):
+                # embeddings passed in memory skip the save/load round trip
+                full_audio_emb = audio_embedding_path
+            else:
+                if not os.path.exists(audio_embedding_path):
+                    continue
+                full_audio_emb = torch.load(audio_embedding_path)
             if torch.isnan(full_audio_emb).any():
                 continue
             if full_audio_emb.shape[0] <= frame_num:
@@ -322,7 +329,7 @@ class MultiTalkPipeline:
         torch.cuda.manual_seed_all(seed)
         np.random.seed(seed)
         random.seed(seed)
-        torch.backends.cudnn.deterministic = True
+        torch.backends.cudnn.deterministic = deterministic
 
         # start video generation iteratively
         while True:
@@ -494,6 +501,9 @@ class MultiTalkPipeline:
                 
                 progress_wrap = partial(tqdm, total=len(timesteps)-1) if progress else (lambda x: x)
                 for i in progress_wrap(range(len(timesteps)-1)):
+                    # Start a new CUDA graph iteration so a denoiser compiled with
+                    # mode="reduce-overhead" replays its captured graphs every step
+                    torch.compiler.cudagraph_mark_step_begin()
                     timestep = timesteps[i]
                     latent_model_input = [latent.to(self.device)]
 